@@ -1,18 +1,46 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
-from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Dict, Iterator, AsyncIterator, Tuple
+from datetime import date, datetime, time, timedelta, timezone
 import pandas as pd
 import os
+import json
+import asyncio
+import base64
 import random
+import secrets
 import uvicorn
 import pytz
 from dotenv import load_dotenv
 import bcrypt
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from database.models import Base, User, SurveyResponse
 from database.config import engine, SessionLocal
+from database.init_db import upgrade_schema
+from database.queries import (
+    load_recent_sales, get_sales_cities, get_location_names, get_location_coordinates, CITY_COORDINATES,
+    load_latest_predictions, load_latest_city_prediction, load_risk_history, downsample_risk_history,
+    get_latest_prediction_time, record_survey_rollup, load_survey_rollups
+)
+from location_index import LocationCatalog
+from spatial_index import NearestLocationIndex, postal_code_centroid, inverse_distance_weights
+from geo_layer import RiskLayerCache, build_risk_layer, load_province_boundaries
+from columnar_store import load_recent_columnar_sales, read_sales_dataset
+from frame_schema import compact_sales_frame
+from shared_snapshot import SnapshotReader
+from risk_scheduler import RiskScheduler
+from leader_lock import LeaderLock
+from risk_payload import compact_risk_payload, encode_json
+from compression import CompressionMiddleware, choose_encoding
+from risk_events import LocalRiskBroker, format_event
+from single_flight import SingleFlight
+from metrics import REGISTRY, Counter, CallbackMetric, MetricsMiddleware, stage
+from profiling import PROFILING_ENABLED, PROFILE_TOKEN, ProfilingMiddleware, profile_ring
+from survey_rollups import SurveyRollupUpdater
 
 # Load environment variables
 load_dotenv()
@@ -26,8 +54,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # The survey history cursor is returned in a header the frontend must be able to read
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Negotiate brotli/gzip for responses above COMPRESSION_MIN_SIZE bytes
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "500")))
+
+# Per-route latency and in-flight requests, exported on /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Opt-in request profiling: PROFILING=1 plus an X-Profile header or PROFILE_SAMPLE_RATE
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -45,6 +85,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 # Initialize database
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 # User models
 class UserSignUp(BaseModel):
@@ -57,102 +98,233 @@ class UserSignIn(BaseModel):
     email: str
     password: str
 
-def get_flu_risk_data() -> Dict:
-    try:
-        # Read sales data
+# Survey models
+class SurveySubmission(BaseModel):
+    age: int
+    postalCode: str
+    organization: str
+    organizationType: str
+    symptoms: str
+    province: str
+    submissionId: str
+    timezone: str
+    timestamp: str
+    userEmail: str
+
+# Survey history paging
+SURVEY_PAGE_SIZE_MAX = 1000
+SURVEY_STREAM_BATCH_SIZE = 500
+
+# Symptom rollups are updated with each survey insert, or recounted every
+# SURVEY_ROLLUP_INTERVAL seconds in batch mode when it is set
+SURVEY_ROLLUP_INTERVAL = float(os.getenv("SURVEY_ROLLUP_INTERVAL") or 0)
+SURVEY_ROLLUP_MAX_DAYS = 366
+SURVEY_ROLLUP_LOCK = os.getenv("SURVEY_ROLLUP_LOCK", "/tmp/flu_survey_rollups.lock")
+survey_rollup_updater = SurveyRollupUpdater(SURVEY_ROLLUP_INTERVAL, lock=LeaderLock(SURVEY_ROLLUP_LOCK))
+
+# Risk snapshot published by a shared builder process (multi-worker mode, see gunicorn.conf.py)
+RISK_SNAPSHOT_DIR = os.getenv("RISK_SNAPSHOT_DIR")
+# Past RISK_SNAPSHOT_MAX_AGE (default two build intervals) reads fall back to stored runs or computing
+RISK_SNAPSHOT_MAX_AGE = float(os.getenv("RISK_SNAPSHOT_MAX_AGE") or 2 * float(os.getenv("RISK_SNAPSHOT_INTERVAL", "300")))
+risk_snapshots = SnapshotReader(RISK_SNAPSHOT_DIR, max_age=RISK_SNAPSHOT_MAX_AGE) if RISK_SNAPSHOT_DIR else None
+
+def current_risk_snapshot():
+    return risk_snapshots.current() if risk_snapshots is not None else None
+
+# Partitioned Parquet/Feather sales dataset; when set it replaces the sales table and CSV
+SALES_DATASET_PATH = os.getenv("SALES_DATASET_PATH")
+
+def load_recent_sales_data(current_date: datetime, days: int = 7, fallback_rows: int = 7,
+                           cities: Optional[List[str]] = None) -> pd.DataFrame:
+    if SALES_DATASET_PATH:
+        # Month partitions and row groups outside the window are skipped
+        with stage("sales.dataset"):
+            return compact_sales_frame(load_recent_columnar_sales(SALES_DATASET_PATH, current_date, days, fallback_rows, cities))
+    
+    # Only the trailing window is read, seeking the (city, date) index, for the
+    # cached catalog's cities rather than a DISTINCT scan of the sales table
+    with stage("sales.db"), SessionLocal() as session:
+        recent_data = load_recent_sales(session, current_date, days, fallback_rows, cities or list(location_catalog.names()))
+    
+    if recent_data.empty and cities is None:
+        # Sales table has not been imported yet, fall back to the bundled CSV
+        with stage("sales.csv"):
+            sales_data_path = os.path.join(os.path.dirname(__file__), "database", "sales_data.csv")
+            sales_data = pd.read_csv(sales_data_path)
+            sales_data['date'] = pd.to_datetime(sales_data['date']).dt.tz_localize(None)
+            recent_data = sales_data[sales_data['date'] >= current_date - timedelta(days=days)]
+            if recent_data.empty:
+                recent_data = sales_data.sort_values(['city', 'date']).groupby('city').tail(fallback_rows)
+    
+    with stage("sales.compact"):
+        return compact_sales_frame(recent_data)
+
+# List of all Canadian cities we want to track
+TRACKED_CITIES = [
+    'toronto', 'montreal', 'vancouver', 'calgary', 'edmonton', 'ottawa',
+    'winnipeg', 'quebec city', 'hamilton', 'london', 'halifax', 'saskatoon',
+    'regina', "st. john's", 'kelowna'
+]
+
+def get_seasonal_factor(month: int) -> float:
+    # Higher in winter months
+    return 1.5 if month in [12, 1, 2] else 1.2 if month in [3, 4, 10, 11] else 1.0
+
+def load_location_names() -> List[str]:
+    if SALES_DATASET_PATH:
+        return read_sales_dataset(SALES_DATASET_PATH, columns=['city'])['city'].unique().tolist()
+    
+    with SessionLocal() as session:
+        names = get_location_names(session)
+        if not names:
+            # Location table not populated yet, use the cities with sales data
+            names = get_sales_cities(session)
+    
+    if not names:
         sales_data_path = os.path.join(os.path.dirname(__file__), "database", "sales_data.csv")
-        sales_data = pd.read_csv(sales_data_path)
+        names = pd.read_csv(sales_data_path, usecols=['city'])['city'].unique().tolist()
+    
+    return names
+
+# Cached, sorted location names; reloaded after the TTL or on refresh()
+location_catalog = LocationCatalog(load_location_names, ttl=int(os.getenv("LOCATIONS_CACHE_TTL", "300")))
+
+def load_tracked_coordinates() -> List[Tuple[str, float, float]]:
+    with SessionLocal() as session:
+        rows = get_location_coordinates(session)
+    if not rows:
+        # Location table not populated yet, use the seed coordinates
+        rows = [(name, lat, lon) for name, (lat, lon) in CITY_COORDINATES.items()]
+    
+    # Only tracked cities have a risk to interpolate from
+    return [(name, lat, lon) for name, lat, lon in rows if name.lower() in TRACKED_CITIES]
+
+# Ball tree over the tracked cities' coordinates; reloaded like the catalog
+nearest_index = NearestLocationIndex(load_tracked_coordinates, ttl=location_catalog.ttl)
+
+@app.on_event("startup")
+def build_location_index():
+    # Build the location, autocomplete and spatial indexes before the first request
+    location_catalog.refresh()
+    nearest_index.refresh()
+
+# Simplified province outlines for the map layer, if a boundary file is configured
+province_boundaries: Dict[str, Dict] = {}
+
+@app.on_event("startup")
+def load_map_boundaries():
+    boundaries_path = os.getenv("PROVINCE_BOUNDARIES_PATH")
+    if boundaries_path:
+        province_boundaries.update(load_province_boundaries(boundaries_path))
+
+def build_risk_geojson() -> Dict:
+    city_coordinates = {name.lower(): (name, lat, lon) for name, lat, lon in load_tracked_coordinates()}
+    # Same snapshot, stored run or single-flight source as /api/flu-risk
+    return build_risk_layer(read_flu_risk_data(), city_coordinates, province_boundaries)
+
+# Serialized, gzipped map layer, rebuilt when the data version changes or after the TTL
+risk_layer_cache = RiskLayerCache(build_risk_geojson, ttl=int(os.getenv("RISK_LAYER_CACHE_TTL", "300")))
+
+def load_recent_city_sales_data(city: str, current_date: datetime, days: int = 7, fallback_rows: int = 7) -> pd.DataFrame:
+    # The city's own rows in the window are exactly what get_flu_risk_data() uses for it,
+    # and only they are read, seeking the (city, date) index
+    city_name = location_catalog.resolve(city)
+    if city_name is not None:
+        city_data = load_recent_sales_data(current_date, days, fallback_rows=0, cities=[city_name])
+        if not city_data.empty:
+            return city_data
+    
+    # Otherwise take the same path as the full computation: the window of every city (or
+    # its latest-rows and CSV fallbacks), then this city's rows or the average of all
+    recent_data = load_recent_sales_data(current_date, days, fallback_rows)
+    city_data = recent_data[recent_data['city_key'] == city]
+    return city_data if not city_data.empty else recent_data
+
+def calculate_city_risk(city_data: pd.DataFrame, current_date: datetime, seasonal_factor: float) -> Dict[str, float]:
+    # Create a copy of the city data to avoid SettingWithCopyWarning
+    city_data = city_data.copy()
+    
+    # Calculate base risk using normalized flu cases
+    flu_cases_per_100k = (city_data['flu_cases'].mean() / city_data['population'].mean()) * 100000
+    base_risk = min(10, max(1, flu_cases_per_100k / 50))
+    
+    # Add population density factor
+    population_density = city_data['population'].mean() / city_data['land_area'].mean()
+    density_factor = min(1.5, 1 + (population_density / 5000))
+    
+    # Calculate initial risk with all factors
+    initial_risk = base_risk * density_factor * seasonal_factor
+    initial_risk = min(10, max(1, initial_risk))
+    
+    # Calculate trend based on 7-day moving average
+    city_data.loc[:, 'flu_cases_ma'] = city_data['flu_cases'].rolling(window=7, min_periods=1).mean()
+    trend = city_data['flu_cases_ma'].pct_change(fill_method=None).mean()
+    if pd.isna(trend):
+        trend = 0
+    
+    # Create daily predictions for the next 7 days
+    city_future_risks = {}
+    for i in range(0, 7):
+        future_date = current_date + timedelta(days=i)
+        if i == 0:
+            # For the first day, use the initial risk value
+            projected_risk = initial_risk
+        else:
+            # For subsequent days, project risk with realistic variation
+            projected_risk = initial_risk * (1 + trend * i)
+            random_variation = 1 + (random.random() - 0.5) * 0.2
+            projected_risk *= random_variation
         
-        # Convert dates to datetime and ensure they're timezone-naive
-        sales_data['date'] = pd.to_datetime(sales_data['date']).dt.tz_localize(None)
+        # Add seasonal adjustment for future dates
+        projected_risk *= get_seasonal_factor(future_date.month)
+        projected_risk = min(10, max(1, projected_risk))
         
+        city_future_risks[future_date.strftime('%Y-%m-%d')] = projected_risk
+    
+    return city_future_risks
+
+def get_flu_risk_data() -> Dict:
+    try:
         # Set the date to current date
         current_date = datetime.now()
         
-        # Get data for the last 7 days
-        recent_data = sales_data[sales_data['date'] >= current_date - timedelta(days=7)].copy()
-        
-        # If no recent data, use the most recent data available
-        if recent_data.empty:
-            recent_data = sales_data.sort_values('date', ascending=False).head(7).copy()
+        # Get data for the last 7 days, or the latest 7 days of each city
+        with stage("risk.load_sales"):
+            recent_data = load_recent_sales_data(current_date)
         
         # Calculate seasonal factor (higher in winter months)
-        month = current_date.month
-        seasonal_factor = 1.5 if month in [12, 1, 2] else 1.2 if month in [3, 4, 10, 11] else 1.0
+        seasonal_factor = get_seasonal_factor(current_date.month)
         
         # Initialize dictionaries for storing results
         current_city_risks = {}
         future_risks = {}
         provincial_risks = {}
         
-        # List of all Canadian cities we want to track
-        all_cities = [
-            'toronto', 'montreal', 'vancouver', 'calgary', 'edmonton', 'ottawa',
-            'winnipeg', 'quebec city', 'hamilton', 'london', 'halifax', 'saskatoon',
-            'regina', "st. john's", 'kelowna'
-        ]
-        
         # Calculate current city risks and future predictions
-        for city in all_cities:
-            # Create a copy of the city data to avoid SettingWithCopyWarning
-            city_mask = recent_data['city'].str.lower() == city.lower()
-            city_data = recent_data[city_mask].copy()
-            
-            if city_data.empty:
-                # If no data for this city, use average values
-                city_data = recent_data.copy()
-            
-            # Calculate base risk using normalized flu cases
-            flu_cases_per_100k = (city_data['flu_cases'].mean() / city_data['population'].mean()) * 100000
-            base_risk = min(10, max(1, flu_cases_per_100k / 50))
-            
-            # Add population density factor
-            population_density = city_data['population'].mean() / city_data['land_area'].mean()
-            density_factor = min(1.5, 1 + (population_density / 5000))
-            
-            # Calculate initial risk with all factors
-            initial_risk = base_risk * density_factor * seasonal_factor
-            initial_risk = min(10, max(1, initial_risk))
-            
-            # Calculate trend based on 7-day moving average
-            city_data.loc[:, 'flu_cases_ma'] = city_data['flu_cases'].rolling(window=7, min_periods=1).mean()
-            trend = city_data['flu_cases_ma'].pct_change(fill_method=None).mean()
-            if pd.isna(trend):
-                trend = 0
-            
-            # Create daily predictions for the next 7 days
-            city_future_risks = {}
-            for i in range(0, 7):
-                future_date = current_date + timedelta(days=i)
-                if i == 0:
-                    # For the first day, use the initial risk value
-                    projected_risk = initial_risk
-                else:
-                    # For subsequent days, project risk with realistic variation
-                    projected_risk = initial_risk * (1 + trend * i)
-                    random_variation = 1 + (random.random() - 0.5) * 0.2
-                    projected_risk *= random_variation
+        with stage("risk.cities"):
+            city_keys = recent_data['city_key']
+            for city in TRACKED_CITIES:
+                city_data = recent_data[city_keys == city]
+                
+                if city_data.empty:
+                    # If no data for this city, use average values
+                    city_data = recent_data
                 
-                # Add seasonal adjustment for future dates
-                future_month = future_date.month
-                future_seasonal_factor = 1.5 if future_month in [12, 1, 2] else 1.2 if future_month in [3, 4, 10, 11] else 1.0
-                projected_risk *= future_seasonal_factor
-                projected_risk = min(10, max(1, projected_risk))
+                city_future_risks = calculate_city_risk(city_data, current_date, seasonal_factor)
                 
-                city_future_risks[future_date.strftime('%Y-%m-%d')] = projected_risk
-            
-            # Store the current risk as the first day's prediction
-            current_city_risks[city.lower()] = city_future_risks[current_date.strftime('%Y-%m-%d')]
-            future_risks[city.lower()] = city_future_risks
+                # Store the current risk as the first day's prediction
+                current_city_risks[city] = city_future_risks[current_date.strftime('%Y-%m-%d')]
+                future_risks[city] = city_future_risks
         
         # Calculate provincial risks
-        for province in recent_data['province'].unique():
-            province_mask = recent_data['province'] == province
-            province_data = recent_data[province_mask].copy()
-            flu_cases_per_100k = (province_data['flu_cases'].sum() / province_data['population'].sum()) * 100000
-            base_risk = min(10, max(1, flu_cases_per_100k / 50))
-            risk = base_risk * 1.2 * seasonal_factor
-            provincial_risks[province] = min(10, max(1, risk))
+        with stage("risk.provinces"):
+            for province in recent_data['province'].unique():
+                province_mask = recent_data['province'] == province
+                province_data = recent_data[province_mask].copy()
+                flu_cases_per_100k = (province_data['flu_cases'].sum() / province_data['population'].sum()) * 100000
+                base_risk = min(10, max(1, flu_cases_per_100k / 50))
+                risk = base_risk * 1.2 * seasonal_factor
+                provincial_risks[province] = min(10, max(1, risk))
         
         # Calculate national risk
         flu_cases_per_100k = (recent_data['flu_cases'].sum() / recent_data['population'].sum()) * 100000
@@ -169,19 +341,179 @@ def get_flu_risk_data() -> Dict:
         print(f"Error calculating flu risk data: {str(e)}")
         raise
 
+def get_city_flu_risk_data(location: str) -> Optional[Dict]:
+    try:
+        city = location.lower()
+        if city not in TRACKED_CITIES:
+            return None
+        
+        current_date = datetime.now()
+        with stage("risk.city.load_sales"):
+            city_data = load_recent_city_sales_data(city, current_date)
+        with stage("risk.city.compute"):
+            city_future_risks = calculate_city_risk(city_data, current_date, get_seasonal_factor(current_date.month))
+        
+        return {
+            "current_risk": city_future_risks[current_date.strftime('%Y-%m-%d')],
+            "future_risks": city_future_risks
+        }
+    except Exception as e:
+        print(f"Error calculating flu risk data for {location}: {str(e)}")
+        raise
+
+# Concurrent cold computations share one run; others wait up to RISK_COMPUTE_WAIT_TIMEOUT seconds
+risk_flight = SingleFlight(timeout=float(os.getenv("RISK_COMPUTE_WAIT_TIMEOUT", "30")))
+
+# Precomputed runs in the predictions table (see risk_scheduler.py)
+RISK_SCHEDULER_INTERVAL = float(os.getenv("RISK_SCHEDULER_INTERVAL") or 0)
+USE_PRECOMPUTED_RISK = RISK_SCHEDULER_INTERVAL > 0 or os.getenv("USE_PRECOMPUTED_RISK") == "1"
+PRECOMPUTED_RISK_MAX_AGE = float(os.getenv("PRECOMPUTED_RISK_MAX_AGE", "3600"))
+# Every worker runs a scheduler, but only the holder of the lock file stores runs
+RISK_SCHEDULER_LOCK = os.getenv("RISK_SCHEDULER_LOCK", "/tmp/flu_risk_scheduler.lock")
+risk_scheduler = RiskScheduler(get_flu_risk_data, RISK_SCHEDULER_INTERVAL, lock=LeaderLock(RISK_SCHEDULER_LOCK))
+
+@app.on_event("startup")
+def start_risk_scheduler():
+    if RISK_SCHEDULER_INTERVAL > 0:
+        risk_scheduler.start()
+
+@app.on_event("shutdown")
+def stop_risk_scheduler():
+    risk_scheduler.stop()
+
+def is_fresh_prediction(data: Optional[Dict]) -> bool:
+    if data is None:
+        return False
+    return (datetime.utcnow() - data["computed_at"]).total_seconds() <= PRECOMPUTED_RISK_MAX_AGE
+
+def stored_risk_response(data: Dict) -> Dict:
+    # computed_at only decides freshness; it is not part of the response
+    return {key: value for key, value in data.items() if key != "computed_at"}
+
+RISK_READS = Counter("flu_risk_reads_total", "Risk reads by scope and where they were served from", ["scope", "source"])
+
+def read_flu_risk_data() -> Dict:
+    # Shared snapshot, then the latest stored run, then compute on the spot
+    snapshot = current_risk_snapshot()
+    if snapshot is not None:
+        RISK_READS.labels("all", "snapshot").inc()
+        return snapshot.to_payload()
+    if USE_PRECOMPUTED_RISK:
+        with stage("risk.read_stored"), SessionLocal() as session:
+            data = load_latest_predictions(session)
+        if is_fresh_prediction(data):
+            RISK_READS.labels("all", "stored").inc()
+            return stored_risk_response(data)
+    RISK_READS.labels("all", "computed").inc()
+    return risk_flight.do("all", get_flu_risk_data)
+
+def read_city_flu_risk_data(location: str) -> Optional[Dict]:
+    snapshot = current_risk_snapshot()
+    if snapshot is not None:
+        RISK_READS.labels("city", "snapshot").inc()
+        return snapshot.city(location)
+    if USE_PRECOMPUTED_RISK:
+        with stage("risk.read_stored"), SessionLocal() as session:
+            data = load_latest_city_prediction(session, location.lower())
+        if is_fresh_prediction(data):
+            RISK_READS.labels("city", "stored").inc()
+            return stored_risk_response(data)
+    RISK_READS.labels("city", "computed").inc()
+    return risk_flight.do(f"city:{location.lower()}", lambda: get_city_flu_risk_data(location))
+
+# Risk updates pushed to dashboards over Server-Sent Events
+RISK_EVENTS_POLL_INTERVAL = float(os.getenv("RISK_EVENTS_POLL_INTERVAL", "5"))
+RISK_EVENTS_INTERVAL = int(os.getenv("RISK_EVENTS_INTERVAL", "300"))
+RISK_EVENTS_HEARTBEAT = float(os.getenv("RISK_EVENTS_HEARTBEAT", "15"))
+risk_broker = LocalRiskBroker()
+risk_event_publisher: Optional[asyncio.Task] = None
+
+def current_risk_version() -> str:
+    # Snapshot version, latest stored run, or the recompute interval the clock is in
+    snapshot = current_risk_snapshot()
+    if snapshot is not None:
+        return str(snapshot.version)
+    if USE_PRECOMPUTED_RISK:
+        with SessionLocal() as session:
+            computed_at = get_latest_prediction_time(session)
+        if computed_at is not None:
+            return computed_at.isoformat()
+    return str(int(datetime.now().timestamp()) // RISK_EVENTS_INTERVAL)
+
+async def publish_risk_updates():
+    """Publish a new risk state whenever its version changes, only while someone is listening"""
+    while True:
+        # Any error is logged and retried at the next poll; letting it escape would end the task
+        # silently and freeze every open stream
+        try:
+            try:
+                await asyncio.wait_for(risk_broker.wakeup.wait(), RISK_EVENTS_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            risk_broker.wakeup.clear()
+            if not risk_broker.subscriber_count:
+                continue
+            version = await run_in_threadpool(current_risk_version)
+            if version != risk_broker.version:
+                data = await run_in_threadpool(read_flu_risk_data)
+                risk_broker.publish(data, version)
+        except Exception as e:
+            print(f"Error publishing risk updates: {str(e)}")
+            await asyncio.sleep(RISK_EVENTS_POLL_INTERVAL)
+
+@app.on_event("startup")
+async def start_risk_event_publisher():
+    global risk_event_publisher
+    risk_event_publisher = asyncio.create_task(publish_risk_updates())
+
+@app.on_event("shutdown")
+async def stop_risk_event_publisher():
+    if risk_event_publisher is not None:
+        risk_event_publisher.cancel()
+
+async def stream_risk_events(last_event_id: Optional[str]) -> AsyncIterator[str]:
+    queue = risk_broker.subscribe()
+    try:
+        # Full state first, unless the client reconnects already holding it
+        if risk_broker.state is not None and last_event_id != risk_broker.version:
+            yield format_event(*risk_broker.snapshot_event())
+        while True:
+            try:
+                event, data, version = await asyncio.wait_for(queue.get(), RISK_EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            yield format_event(event, data, version)
+    finally:
+        risk_broker.unsubscribe(queue)
+
 @app.get("/api/locations")
-async def get_locations():
+async def get_locations(request: Request, prefix: Optional[str] = None, limit: Optional[int] = Query(None, ge=1)):
     try:
-        # Read sales data to get available locations
-        sales_data_path = os.path.join(os.path.dirname(__file__), "database", "sales_data.csv")
-        df = pd.read_csv(sales_data_path)
-        locations = df['city'].unique().tolist()
-        return locations
+        # Clients revalidate with If-None-Match and get a 304 until the list changes
+        etag = f'"{location_catalog.version}"'
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={location_catalog.ttl}"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        
+        if prefix:
+            locations = location_catalog.prefix(prefix, limit)
+        else:
+            locations = location_catalog.names(limit)
+        return JSONResponse(content=locations, headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/locations/autocomplete")
+async def autocomplete_locations(q: str, limit: int = Query(10, ge=1, le=50)):
+    try:
+        return location_catalog.autocomplete(q, limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/survey")
-async def submit_survey(response: SurveyResponse, db: Session = Depends(get_db)):
+async def submit_survey(response: SurveySubmission, db: Session = Depends(get_db)):
     try:
         # Create new survey response
         db_survey = SurveyResponse(
@@ -197,6 +529,10 @@ async def submit_survey(response: SurveyResponse, db: Session = Depends(get_db))
             user_email=response.userEmail
         )
         db.add(db_survey)
+        if not SURVEY_ROLLUP_INTERVAL:
+            # Same transaction, so the rollups never count a survey that was rolled back
+            db.flush()
+            record_survey_rollup(db, db_survey)
         db.commit()
         db.refresh(db_survey)
         
@@ -205,54 +541,356 @@ async def submit_survey(response: SurveyResponse, db: Session = Depends(get_db))
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+def survey_to_dict(survey: SurveyResponse) -> Dict:
+    return {
+        "id": survey.id,
+        "age": survey.age,
+        "postalCode": survey.postal_code,
+        "organization": survey.organization,
+        "organizationType": survey.organization_type,
+        "symptoms": survey.symptoms,
+        "province": survey.province,
+        "submissionId": survey.submission_id,
+        "timezone": survey.timezone,
+        "timestamp": survey.timestamp,
+        "userEmail": survey.user_email,
+        "createdAt": survey.created_at.isoformat() if survey.created_at else None
+    }
+
+def encode_survey_cursor(survey: SurveyResponse) -> str:
+    raw = f"{survey.created_at.isoformat()}|{survey.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_survey_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, survey_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(survey_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def query_survey_page(db: Session, user_email: str, start_date: Optional[date], end_date: Optional[date],
+                      after: Optional[Tuple[datetime, int]], limit: int) -> List[SurveyResponse]:
+    # Served by the (user_email, created_at, id) index: equality on the
+    # email, then a range seek past the last (created_at, id) seen
+    query = db.query(SurveyResponse).filter(SurveyResponse.user_email == user_email)
+    if start_date is not None:
+        query = query.filter(SurveyResponse.created_at >= datetime.combine(start_date, time.min))
+    if end_date is not None:
+        query = query.filter(SurveyResponse.created_at < datetime.combine(end_date + timedelta(days=1), time.min))
+    if after is not None:
+        query = query.filter(tuple_(SurveyResponse.created_at, SurveyResponse.id) > tuple_(*after))
+    return query.order_by(SurveyResponse.created_at, SurveyResponse.id).limit(limit).all()
+
+def stream_json_array(items: Iterator[Dict]) -> Iterator[str]:
+    yield "["
+    for i, item in enumerate(items):
+        yield ("," if i else "") + json.dumps(item)
+    yield "]"
+
+def iter_survey_history(user_email: str, start_date: Optional[date], end_date: Optional[date],
+                        after: Optional[Tuple[datetime, int]]) -> Iterator[Dict]:
+    # Walk the whole history in keyset batches on a dedicated session so
+    # memory stays bounded by the batch size, not the history size
+    db = SessionLocal()
+    try:
+        while True:
+            batch = query_survey_page(db, user_email, start_date, end_date, after, SURVEY_STREAM_BATCH_SIZE)
+            for survey in batch:
+                yield survey_to_dict(survey)
+            if len(batch) < SURVEY_STREAM_BATCH_SIZE:
+                break
+            after = (batch[-1].created_at, batch[-1].id)
+            db.expunge_all()
+    finally:
+        db.close()
+
 @app.get("/api/surveys")
-async def get_surveys(user_email: str, db: Session = Depends(get_db)):
+async def get_surveys(
+    user_email: str,
+    limit: Optional[int] = Query(None, ge=1, le=SURVEY_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
     try:
-        surveys = db.query(SurveyResponse).filter(SurveyResponse.user_email == user_email).all()
-        return [
-            {
-                "id": survey.id,
-                "age": survey.age,
-                "postalCode": survey.postal_code,
-                "organization": survey.organization,
-                "organizationType": survey.organization_type,
-                "symptoms": survey.symptoms,
-                "province": survey.province,
-                "submissionId": survey.submission_id,
-                "timezone": survey.timezone,
-                "timestamp": survey.timestamp,
-                "userEmail": survey.user_email,
-                "createdAt": survey.created_at
+        after = decode_survey_cursor(cursor) if cursor else None
+        
+        # Without a limit, stream the full history as before
+        if limit is None:
+            return StreamingResponse(
+                stream_json_array(iter_survey_history(user_email, start_date, end_date, after)),
+                media_type="application/json"
+            )
+        
+        # Fetch one extra row to know whether another page follows
+        surveys = query_survey_page(db, user_email, start_date, end_date, after, limit + 1)
+        headers = {}
+        if len(surveys) > limit:
+            surveys = surveys[:limit]
+            headers["X-Next-Cursor"] = encode_survey_cursor(surveys[-1])
+        return StreamingResponse(
+            stream_json_array(survey_to_dict(survey) for survey in surveys),
+            media_type="application/json",
+            headers=headers
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.on_event("startup")
+def start_survey_rollup_updater():
+    if SURVEY_ROLLUP_INTERVAL > 0:
+        survey_rollup_updater.start()
+
+@app.on_event("shutdown")
+def stop_survey_rollup_updater():
+    survey_rollup_updater.stop()
+
+def read_survey_rollups(start_date: date, end_date: date, province: Optional[str], postal_prefix: Optional[str],
+                        by_prefix: bool) -> pd.DataFrame:
+    with SessionLocal() as session:
+        return load_survey_rollups(session, start_date, end_date, province, postal_prefix, by_prefix)
+
+@app.get("/api/survey-rollups")
+async def get_survey_rollups(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    province: Optional[str] = None,
+    postal_prefix: Optional[str] = Query(None, min_length=1, max_length=7),
+    group_by: str = Query("province", pattern="^(province|postal_prefix)$")
+):
+    try:
+        # Defaults to the last 30 days; ranges are capped so a read stays an index range scan
+        end_date = end_date or datetime.utcnow().date()
+        start_date = start_date or end_date - timedelta(days=29)
+        if start_date > end_date:
+            raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+        if (end_date - start_date).days >= SURVEY_ROLLUP_MAX_DAYS:
+            raise HTTPException(status_code=400, detail=f"Date range is limited to {SURVEY_ROLLUP_MAX_DAYS} days")
+        
+        by_prefix = group_by == "postal_prefix"
+        data = await run_in_threadpool(read_survey_rollups, start_date, end_date, province, postal_prefix, by_prefix)
+        
+        fixed = ['date', 'province', 'postal_prefix', 'responses', 'symptomatic']
+        symptoms = [column for column in data.columns if column not in fixed]
+        rows = []
+        for record in data.to_dict(orient='records'):
+            row = {
+                "date": record['date'].strftime('%Y-%m-%d'),
+                "province": record['province'],
+                "responses": int(record['responses']),
+                "symptomatic": int(record['symptomatic']),
+                "symptoms": {symptom: int(record[symptom]) for symptom in symptoms if record[symptom]}
             }
-            for survey in surveys
-        ]
+            if by_prefix:
+                row["postalPrefix"] = record['postal_prefix']
+            rows.append(row)
+        return rows
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def current_risk_layer():
+    # Risk changes with the day, each new snapshot or stored run, and the set of tracked locations
+    return risk_layer_cache.get(f"{datetime.now():%Y-%m-%d}:{current_risk_version()}:{location_catalog.version}")
+
+@app.get("/api/flu-risk/geojson")
+async def get_flu_risk_geojson(request: Request):
+    try:
+        # A miss (or the catalog's TTL reload) builds on a worker thread, not the event loop
+        layer = await run_in_threadpool(current_risk_layer)
+        headers = {"ETag": layer.etag, "Cache-Control": f"public, max-age={risk_layer_cache.ttl}", "Vary": "Accept-Encoding"}
+        if request.headers.get("if-none-match") == layer.etag:
+            return Response(status_code=304, headers=headers)
+        
+        # Serve the cached gzip body when gzip wins the negotiation; CompressionMiddleware handles br
+        if choose_encoding(request.headers.get("accept-encoding", "")) == "gzip":
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=layer.gzipped, media_type="application/geo+json", headers=headers)
+        return Response(content=layer.body, media_type="application/geo+json", headers=headers)
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        print(f"Error building flu risk map layer: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/flu-risk/stream")
+async def stream_flu_risk(request: Request):
+    # "snapshot" carries the full /api/flu-risk payload, "update" only what changed
+    return StreamingResponse(
+        stream_risk_events(request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/flu-risk/nearby")
+async def get_nearby_flu_risk(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    postal_code: Optional[str] = None,
+    k: int = Query(3, ge=1, le=10),
+    radius_km: Optional[float] = Query(None, gt=0)
+):
+    try:
+        if lat is None or lon is None:
+            centroid = postal_code_centroid(postal_code) if postal_code else None
+            if centroid is None:
+                raise HTTPException(status_code=400, detail="Provide lat and lon or a valid postal_code")
+            lat, lon = centroid
+        
+        # The index reloads inline once its TTL expires, so query it off the event loop
+        neighbours = await run_in_threadpool(nearest_index.nearest, lat, lon, k, radius_km)
+        
+        # Each neighbour goes through the snapshot, stored run and single-flight read path
+        results = await asyncio.gather(*(run_in_threadpool(read_city_flu_risk_data, name) for name, _ in neighbours))
+        city_risks = [(name, distance, risks) for (name, distance), risks in zip(neighbours, results) if risks is not None]
+        if not city_risks:
+            raise HTTPException(status_code=404, detail="No tracked location nearby")
+        
+        # Blend the nearest cities' risks, weighted by inverse squared distance, over the days they all forecast
+        weights = inverse_distance_weights([distance for _, distance, _ in city_risks])
+        days = sorted(set.intersection(*(set(risks["future_risks"]) for _, _, risks in city_risks)))
+        future_risks = {
+            day: float(sum(weight * risks["future_risks"][day] for weight, (_, _, risks) in zip(weights, city_risks)))
+            for day in days
+        }
+        
+        return {
+            "latitude": lat,
+            "longitude": lon,
+            "current_risk": float(sum(weight * risks["current_risk"] for weight, (_, _, risks) in zip(weights, city_risks))),
+            "future_risks": future_risks,
+            "nearest": [
+                {"location": name, "distance_km": round(distance, 1), "current_risk": risks["current_risk"]}
+                for name, distance, risks in city_risks
+            ]
+        }
+    except HTTPException:
+        raise
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
+        print(f"Error getting nearby flu risk for ({lat}, {lon}): {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Longer daily series are rolled up to weeks when resolution is "auto"
+HISTORY_DAILY_MAX_DAYS = int(os.getenv("HISTORY_DAILY_MAX_DAYS", "366"))
+
+@app.get("/api/flu-risk/{location}/history")
+async def get_flu_risk_history(
+    location: str,
+    scope: str = Query("city", pattern="^(city|province|national)$"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    resolution: str = Query("auto", pattern="^(auto|day|week)$"),
+    db: Session = Depends(get_db)
+):
+    try:
+        # Cities are stored under their lower-cased key
+        key = location.lower() if scope == "city" else location
+        daily = load_risk_history(db, scope, key, start_date, end_date)
+        
+        if resolution == "auto":
+            span = (daily["date"].iloc[-1] - daily["date"].iloc[0]).days if not daily.empty else 0
+            resolution = "week" if span > HISTORY_DAILY_MAX_DAYS else "day"
+        history = downsample_risk_history(daily, resolution)
+        
+        return {
+            "location": location,
+            "scope": scope,
+            "resolution": resolution,
+            "points": [
+                {"date": f"{day:%Y-%m-%d}", "min": float(low), "mean": float(mean), "max": float(high), "count": int(count)}
+                for day, low, mean, high, count in history.itertuples(index=False)
+            ]
+        }
+    except Exception as e:
+        print(f"Error getting flu risk history for {location}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/flu-risk/{location}")
 async def get_flu_risk(location: str):
     try:
-        data = get_flu_risk_data()
-        location_lower = location.lower()
-        if location_lower in data["current_city_risks"]:
-            return {
-                "current_risk": data["current_city_risks"][location_lower],
-                "future_risks": data["future_risks"][location_lower]
-            }
+        data = await run_in_threadpool(read_city_flu_risk_data, location)
+        if data is not None:
+            return data
         raise HTTPException(status_code=404, detail="Location not found")
+    except HTTPException:
+        raise
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         print(f"Error getting flu risk for {location}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/flu-risk")
-async def get_flu_risk():
+async def get_flu_risk(
+    format: str = Query("default", pattern="^(default|compact)$"),
+    precision: int = Query(2, ge=0, le=6)
+):
     try:
-        data = get_flu_risk_data()
+        data = await run_in_threadpool(read_flu_risk_data)
+        if format == "compact":
+            with stage("risk.serialize"):
+                body = encode_json(compact_risk_payload(data, precision))
+            return Response(content=body, media_type="application/json")
         return data
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         print(f"Error getting flu risk data: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Scrape-time views of the connection pool, caches, request coalescing and live streams
+def collect_db_pool() -> Dict[Tuple[str], int]:
+    pool = engine.pool
+    return {(state,): getattr(pool, state)() for state in ("size", "checkedin", "checkedout", "overflow") if hasattr(pool, state)}
+
+CallbackMetric("db_pool_connections", "SQLAlchemy connection pool state", collect_db_pool, ["state"])
+CallbackMetric("cache_requests_total", "Cache lookups by cache and result", lambda: {
+    ("locations", "hit"): location_catalog.hits,
+    ("locations", "miss"): location_catalog.misses,
+    ("risk_layer", "hit"): risk_layer_cache.hits,
+    ("risk_layer", "miss"): risk_layer_cache.misses,
+}, ["cache", "result"], kind="counter")
+CallbackMetric("flu_risk_single_flight_total", "Risk computations requested, coalesced into a run in flight, or timed out", lambda: {
+    (event,): risk_flight.stats()[event] for event in ("calls", "coalesced", "timeouts")
+}, ["event"], kind="counter")
+CallbackMetric("flu_risk_stream_subscribers", "Open /api/flu-risk/stream connections", lambda: risk_broker.subscriber_count)
+
+@app.get("/metrics")
+async def get_metrics():
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def check_profiles_access(request: Request):
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    # Profiles hold stack samples of the whole process, so they are never served without a token
+    if not PROFILE_TOKEN:
+        raise HTTPException(status_code=403, detail="Set PROFILE_TOKEN to read profiles")
+    if not secrets.compare_digest(request.headers.get("x-profile", "").encode(), PROFILE_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Profile token required")
+
+@app.get("/api/profiles")
+async def list_profiles(request: Request):
+    check_profiles_access(request)
+    return profile_ring.list()
+
+@app.get("/api/profiles/{name}")
+async def get_profile(name: str, request: Request):
+    check_profiles_access(request)
+    path = profile_ring.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    with open(path, "rb") as profile_file:
+        content = profile_file.read()
+    media_type = "text/plain" if name.endswith(".folded") else "application/octet-stream"
+    return Response(content=content, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{name}"'})
+
 # Authentication endpoints
 @app.post("/api/auth/signup")
 async def signup(user: UserSignUp, db: Session = Depends(get_db)):
@@ -0,0 +1,240 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+import numpy as np
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_data import PRESETS, generate_sales_data, write_sales_data
+from data_processor import FluDataProcessor
+
+DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_results')
+
+# A case is flagged when its best time grows by more than this factor
+REGRESSION_THRESHOLD = 1.2
+
+def seed_everything(seed):
+    # The risk code adds random noise; fix it so runs do the same work
+    random.seed(seed)
+    np.random.seed(seed)
+
+def time_runs(fn, repeats):
+    """Call fn() `repeats` times and return its last result and the wall time of each run"""
+    timings = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, timings
+
+def summarize(case, timings, **extra):
+    return {
+        'case': case,
+        'min_seconds': round(min(timings), 6),
+        'median_seconds': round(statistics.median(timings), 6),
+        'runs': [round(timing, 6) for timing in timings],
+        **extra
+    }
+
+def attach_population(features, data):
+    """Take population and land area from the data; synthetic towns are not in the processor's tables"""
+    per_city = data.groupby('city', observed=True)[['population', 'land_area']].first()
+    features['population'] = features['city'].map(per_city['population']).astype(np.float64)
+    features['land_area'] = features['city'].map(per_city['land_area']).astype(np.float64)
+    return features
+
+def benchmark_processor(csv_path, dataset_path, repeats):
+    """Time FluDataProcessor load, preprocess and create_target"""
+    results = []
+    processor = FluDataProcessor()
+
+    data, timings = time_runs(lambda: processor.load_data(csv_path), repeats)
+    results.append(summarize('processor.load_csv', timings))
+    _, timings = time_runs(lambda: processor.load_data(dataset_path), repeats)
+    results.append(summarize('processor.load_dataset', timings))
+
+    features, timings = time_runs(lambda: processor.preprocess_sales_data(data), repeats)
+    results.append(summarize('processor.preprocess', timings))
+
+    attach_population(features, data)
+    _, timings = time_runs(lambda: processor.create_target(data), repeats)
+    results.append(summarize('processor.create_target', timings))
+
+    return results, processor
+
+def benchmark_predictor(processor, repeats, epochs):
+    """Time FluRiskPredictor train, predict and the risk aggregations; needs TensorFlow/Keras"""
+    try:
+        from flu_risk_predictor import FluRiskPredictor
+    except ImportError as e:
+        reason = f"skipped: {e}"
+        cases = ['predictor.train', 'predictor.predict', 'predictor.national_risk',
+                 'predictor.provincial_risks', 'predictor.city_risks', 'predictor.future_risks']
+        return [{'case': case, 'skipped': reason} for case in cases]
+
+    numerical_features, y = processor.get_features_and_target()
+    features = processor.features
+    predictor = FluRiskPredictor()
+    X_scaled = predictor.preprocess_data(numerical_features.astype(np.float32))
+    y = y.astype(np.float32)
+
+    results = []
+    # A fresh model per run so every run trains from scratch
+    def train():
+        predictor.model = None
+        return predictor.train(X_scaled, y, epochs=epochs)
+    _, timings = time_runs(train, repeats)
+    results.append(summarize('predictor.train', timings, epochs=epochs))
+
+    for case, fn in [
+        ('predictor.predict', lambda: predictor.predict(X_scaled)),
+        ('predictor.national_risk', lambda: predictor.calculate_national_risk(features, X_scaled)),
+        ('predictor.provincial_risks', lambda: predictor.calculate_provincial_risks(processor, X_scaled)),
+        ('predictor.city_risks', lambda: predictor.predict_city_risks(processor, X_scaled)),
+        ('predictor.future_risks', lambda: predictor.predict_future_risks(processor, X_scaled, days=7)),
+    ]:
+        _, timings = time_runs(fn, repeats)
+        results.append(summarize(case, timings))
+    return results
+
+def benchmark_api(dataset_path, repeats, seed):
+    """Time api.get_flu_risk_data() in a fresh interpreter reading the generated dataset"""
+    with tempfile.TemporaryDirectory() as database_dir:
+        env = dict(
+            os.environ,
+            SALES_DATASET_PATH=dataset_path,
+            DATABASE_URL=f"sqlite:///{os.path.join(database_dir, 'benchmark.db')}"
+        )
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), 'api-case', '--repeats', str(repeats), '--seed', str(seed)],
+            check=True, capture_output=True, text=True, env=env
+        ).stdout
+    return [json.loads(output.strip().splitlines()[-1])]
+
+def run_api_case(repeats, seed):
+    seed_everything(seed)
+    from api import get_flu_risk_data
+    _, timings = time_runs(get_flu_risk_data, repeats)
+    print(json.dumps(summarize('api.get_flu_risk_data', timings)))
+
+def run_preset(name, repeats, epochs, seed):
+    n_locations, years = PRESETS[name]
+    print(f"{name}: generating {n_locations} locations x {years} years")
+    data = generate_sales_data(n_locations, years, seed=seed)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        csv_path = os.path.join(work_dir, 'sales_data.csv')
+        dataset_path = os.path.join(work_dir, 'sales_dataset')
+        write_sales_data(data, csv_path, 'csv')
+        write_sales_data(data, dataset_path, 'parquet')
+
+        seed_everything(seed)
+        results, processor = benchmark_processor(csv_path, dataset_path, repeats)
+        results += benchmark_predictor(processor, repeats, epochs)
+        results += benchmark_api(dataset_path, repeats, seed)
+
+    for result in results:
+        result.update({'preset': name, 'locations': n_locations, 'years': years, 'rows': len(data)})
+        if 'skipped' in result:
+            print(f"  {result['case']:<28} {result['skipped']}")
+        else:
+            print(f"  {result['case']:<28} min {result['min_seconds'] * 1000:>10.2f} ms  median {result['median_seconds'] * 1000:>10.2f} ms")
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], check=True, capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def latest_results(results_dir):
+    if not os.path.isdir(results_dir):
+        return None
+    files = sorted(name for name in os.listdir(results_dir) if name.endswith('.json'))
+    return os.path.join(results_dir, files[-1]) if files else None
+
+def compare_results(previous, current, threshold=REGRESSION_THRESHOLD):
+    """Return (preset, case, previous min, current min, ratio, regressed) for cases present in both runs"""
+    baseline = {
+        (result['preset'], result['case']): result['min_seconds']
+        for result in previous['results'] if 'min_seconds' in result
+    }
+    rows = []
+    for result in current['results']:
+        key = (result['preset'], result['case'])
+        if 'min_seconds' not in result or key not in baseline:
+            continue
+        ratio = result['min_seconds'] / baseline[key] if baseline[key] else float('inf')
+        rows.append((*key, baseline[key], result['min_seconds'], ratio, ratio > threshold))
+    return rows
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Benchmark the data processor, predictor and risk API on synthetic data')
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', help='Run the suite (default)')
+    run_parser.add_argument('--presets', nargs='+', choices=sorted(PRESETS), default=['small', 'medium'])
+    run_parser.add_argument('--repeats', type=int, default=3)
+    run_parser.add_argument('--epochs', type=int, default=5, help='Training epochs per predictor.train run')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--results-dir', default=DEFAULT_RESULTS_DIR)
+    run_parser.add_argument('--compare', help='Results file to compare against; defaults to the latest in --results-dir')
+    run_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+
+    api_parser = subparsers.add_parser('api-case')
+    api_parser.add_argument('--repeats', type=int, default=3)
+    api_parser.add_argument('--seed', type=int, default=42)
+
+    args = parser.parse_args()
+    if args.command is None:
+        args = run_parser.parse_args([], namespace=args)
+        args.command = 'run'
+    return args
+
+def main():
+    args = parse_arguments()
+    if args.command == 'api-case':
+        run_api_case(args.repeats, args.seed)
+        return
+
+    previous_path = args.compare or latest_results(args.results_dir)
+    results = []
+    for name in args.presets:
+        results += run_preset(name, args.repeats, args.epochs, args.seed)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'repeats': args.repeats,
+        'results': results
+    }
+    os.makedirs(args.results_dir, exist_ok=True)
+    output_path = os.path.join(args.results_dir, f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output_path, 'w') as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"\nWrote {output_path}")
+
+    if previous_path:
+        with open(previous_path) as previous_file:
+            previous = json.load(previous_file)
+        print(f"Compared with {previous_path} ({previous.get('git_commit')}):")
+        for preset, case, before, after, ratio, regressed in compare_results(previous, report, args.threshold):
+            flag = '  REGRESSION' if regressed else ''
+            print(f"  {preset:<7} {case:<28} {before * 1000:>10.2f} -> {after * 1000:>10.2f} ms  x{ratio:.2f}{flag}")
+
+if __name__ == "__main__":
+    main()
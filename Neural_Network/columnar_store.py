@@ -0,0 +1,196 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from datetime import datetime, timedelta
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'sales_data.csv')
+DEFAULT_DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'sales_dataset')
+
+# Stored column types; province and month are partition keys (directories)
+SALES_SCHEMA = pa.schema([
+    ('city', pa.dictionary(pa.int32(), pa.string())),
+    ('province', pa.dictionary(pa.int32(), pa.string())),
+    ('date', pa.date32()),
+    ('sales', pa.int32()),
+    ('flu_cases', pa.int32()),
+    ('population', pa.int32()),
+    ('land_area', pa.float32()),
+    ('month', pa.string()),
+])
+
+PARTITION_SCHEMA = pa.schema([('province', pa.string()), ('month', pa.string())])
+
+FORMATS = {'parquet': 'parquet', 'feather': 'ipc'}
+
+def _dataset_format(path):
+    # Feather (Arrow IPC) files are read in place from the mapping; Parquet pages are decoded
+    for root, _, files in os.walk(path):
+        for file_name in files:
+            return 'ipc' if file_name.endswith(('.arrow', '.feather', '.ipc')) else 'parquet'
+    return 'parquet'
+
+def to_sales_table(data):
+    """Convert a sales DataFrame to an Arrow table in the stored schema"""
+    data = data.copy()
+    data['date'] = pd.to_datetime(data['date']).dt.date
+    data['month'] = pd.to_datetime(data['date']).dt.strftime('%Y-%m')
+    table = pa.Table.from_pandas(data[SALES_SCHEMA.names], preserve_index=False)
+    return table.cast(SALES_SCHEMA)
+
+def write_sales_dataset(data, path=DEFAULT_DATASET_PATH, file_format='parquet'):
+    """Write sales data partitioned by province and month, replacing any partitions it touches"""
+    table = to_sales_table(data)
+    ds.write_dataset(
+        table,
+        path,
+        format=FORMATS[file_format],
+        partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive'),
+        existing_data_behavior='delete_matching',
+        basename_template='part-{i}.' + ('parquet' if file_format == 'parquet' else 'arrow')
+    )
+    return table.num_rows
+
+def open_sales_dataset(path=DEFAULT_DATASET_PATH):
+    """Open the partitioned dataset over a memory-mapping local filesystem"""
+    return ds.dataset(
+        path,
+        format=_dataset_format(path),
+        # Read province keys back as a dictionary (categorical) column
+        partitioning=ds.HivePartitioning.discover(infer_dictionary=True),
+        filesystem=pafs.LocalFileSystem(use_mmap=True)
+    )
+
+def read_sales_dataset(path=DEFAULT_DATASET_PATH, columns=None, since=None, cities=None, provinces=None):
+    """Read sales rows as a DataFrame, pushing the column projection and filters down to the scan
+
+    Filters on `since` prune whole month partitions before row-group statistics are consulted.
+    """
+    dataset = open_sales_dataset(path)
+    if columns is None:
+        columns = [name for name in SALES_SCHEMA.names if name != 'month']
+
+    conditions = []
+    if since is not None:
+        conditions.append(pc.field('month') >= since.strftime('%Y-%m'))
+        conditions.append(pc.field('date') >= pa.scalar(since.date(), pa.date32()))
+    if cities is not None:
+        conditions.append(pc.field('city').isin(list(cities)))
+    if provinces is not None:
+        conditions.append(pc.field('province').isin(list(provinces)))
+
+    row_filter = None
+    for condition in conditions:
+        row_filter = condition if row_filter is None else row_filter & condition
+
+    data = dataset.to_table(columns=columns, filter=row_filter).to_pandas(date_as_object=False)
+    if 'date' in data.columns:
+        data['date'] = pd.to_datetime(data['date'])
+    return data
+
+def load_recent_columnar_sales(path, current_date, days=7, fallback_rows=7, cities=None):
+    """Load the trailing `days` window, or the latest `fallback_rows` per city if the window is empty (0 for no fallback)"""
+    since = current_date - timedelta(days=days)
+    recent_data = read_sales_dataset(path, since=since, cities=cities)
+    # The pushed-down filter is by day, the window starts at a time of day
+    recent_data = recent_data[recent_data['date'] >= since]
+
+    if recent_data.empty and fallback_rows:
+        sales_data = read_sales_dataset(path, cities=cities)
+        recent_data = sales_data.sort_values(['city', 'date']).groupby('city', observed=True).tail(fallback_rows)
+
+    return recent_data.sort_values(['city', 'date']).reset_index(drop=True)
+
+def load_source(source):
+    """Load the full sales history from 'database' or a CSV path"""
+    if source == 'database':
+        from data_processor import FluDataProcessor
+        return FluDataProcessor().load_data_from_db()
+    return pd.read_csv(source)
+
+def _measure(kind, path):
+    # Runs in a fresh interpreter so peak RSS reflects only this load.
+    # resource is POSIX-only; elsewhere only the load time is measured
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+    start = time.perf_counter()
+    if kind == 'csv':
+        data = pd.read_csv(path)
+        data['date'] = pd.to_datetime(data['date'])
+    else:
+        data = read_sales_dataset(path)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+    return {
+        'kind': kind,
+        'rows': len(data),
+        'load_seconds': round(elapsed, 4),
+        'rss_delta_kb': peak - baseline if resource else None,
+        'frame_bytes': int(data.memory_usage(deep=True).sum())
+    }
+
+def compare(csv_path, dataset_path, repeats=3):
+    """Compare load time and peak RSS of the CSV and the columnar dataset"""
+    results = []
+    for kind, path in (('csv', csv_path), ('columnar', dataset_path)):
+        runs = []
+        for _ in range(repeats):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), 'measure', '--kind', kind, '--path', path],
+                check=True, capture_output=True, text=True
+            ).stdout
+            runs.append(json.loads(output))
+        best = min(runs, key=lambda run: run['load_seconds'])
+        results.append(best)
+    return results
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Columnar storage for pharmacy sales data')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help='Convert the CSV or database to a partitioned dataset')
+    convert_parser.add_argument('--source', default=DEFAULT_CSV_PATH, help="CSV path or 'database'")
+    convert_parser.add_argument('--output', default=DEFAULT_DATASET_PATH)
+    convert_parser.add_argument('--format', choices=sorted(FORMATS), default='parquet')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare load time and RSS against the CSV')
+    compare_parser.add_argument('--csv', default=DEFAULT_CSV_PATH)
+    compare_parser.add_argument('--dataset', default=DEFAULT_DATASET_PATH)
+    compare_parser.add_argument('--repeats', type=int, default=3)
+
+    measure_parser = subparsers.add_parser('measure')
+    measure_parser.add_argument('--kind', choices=['csv', 'columnar'], required=True)
+    measure_parser.add_argument('--path', required=True)
+
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+
+    if args.command == 'convert':
+        data = load_source(args.source)
+        rows = write_sales_dataset(data, args.output, args.format)
+        print(f"Wrote {rows} rows to {args.output} ({args.format})")
+    elif args.command == 'compare':
+        for result in compare(args.csv, args.dataset, args.repeats):
+            rss = f"+{result['rss_delta_kb'] / 1024:.1f} MiB" if result['rss_delta_kb'] is not None else "n/a"
+            print(f"{result['kind']:>8}: {result['rows']} rows in {result['load_seconds'] * 1000:.1f} ms, "
+                  f"peak RSS {rss}, frame {result['frame_bytes'] / 1024:.1f} KiB")
+    elif args.command == 'measure':
+        print(json.dumps(_measure(args.kind, args.path)))
+
+if __name__ == "__main__":
+    main()
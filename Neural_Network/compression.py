@@ -0,0 +1,123 @@
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def parse_accept_encoding(header):
+    """Return the codings a client accepts, mapped to their q-values"""
+    accepted = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+def choose_encoding(header):
+    """Pick br when the brotli package is installed and the client accepts it, gzip otherwise"""
+    accepted = parse_accept_encoding(header)
+    candidates = (['br'] if brotli is not None else []) + ['gzip']
+    wildcard = accepted.get('*', 0.0)
+    usable = [coding for coding in candidates if accepted.get(coding, wildcard) > 0]
+    if not usable:
+        return None
+    return max(usable, key=lambda coding: accepted.get(coding, wildcard))
+
+def add_vary_accept_encoding(headers):
+    """Add Accept-Encoding to Vary unless the response already varies on it"""
+    tokens = [token.strip().lower() for token in headers.get("vary", "").split(",")]
+    if "accept-encoding" not in tokens:
+        headers.add_vary_header("Accept-Encoding")
+
+class _Compressor:
+    def __init__(self, encoding, gzip_level, brotli_quality):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data, final=False):
+        # Flush every chunk so streamed responses reach the client as they are produced
+        if self.encoding == 'br':
+            output = self._compressor.process(data)
+            return output + (self._compressor.finish() if final else self._compressor.flush())
+        output = self._compressor.compress(data)
+        return output + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class CompressionMiddleware:
+    """Compress responses with brotli or gzip, negotiated from Accept-Encoding
+
+    Responses that already set Content-Encoding (e.g. the pre-gzipped map
+    layer) and bodies under `minimum_size` are passed through untouched.
+    """
+
+    def __init__(self, app, minimum_size=500, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                # Hold the headers until the first body chunk decides the encoding
+                start_message = message
+                passthrough = "content-encoding" in Headers(raw=message["headers"])
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                initial, start_message = start_message, None
+                if passthrough or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(initial)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers = MutableHeaders(raw=initial["headers"])
+                headers["Content-Encoding"] = encoding
+                add_vary_accept_encoding(headers)
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                body = compressor.compress(body, final=not more_body)
+                if not more_body:
+                    headers["Content-Length"] = str(len(body))
+                await send(initial)
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            if passthrough:
+                await send(message)
+                return
+            await send({"type": "http.response.body", "body": compressor.compress(body, final=not more_body), "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -6,11 +6,51 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from database.config import engine
 from database.models import SalesData
+from database.queries import load_survey_rollups
 from sklearn.preprocessing import StandardScaler
+from columnar_store import read_sales_dataset
+from frame_schema import compact_sales_frame
+from metrics import timed
 
 # Add the current directory to the Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+def risk_levels(total_sales, total_flu_cases, population, land_area, risk_thresholds=None):
+    """Risk index (1, 3, 7 or 10) from the normalized flu-to-sales ratio and population density, elementwise over arrays"""
+    if risk_thresholds is None:
+        # Default thresholds based on normalized flu-to-sales ratio
+        risk_thresholds = {
+            'low': 0.1,    # 10% of normalized ratio
+            'medium': 0.2,  # 20% of normalized ratio
+            'high': 0.3    # 30% of normalized ratio
+        }
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Calculate population density (people per square km)
+        population_density = population / land_area
+        
+        # Calculate normalized values per capita
+        flu_per_capita = total_flu_cases / population
+        sales_per_capita = total_sales / population
+        
+        # Calculate risk based on the ratio of normalized flu cases to normalized sales
+        # Higher ratio indicates higher risk
+        risk_ratio = np.where(sales_per_capita > 0, flu_per_capita / sales_per_capita, 0.0)
+        
+        # Adjust risk based on population density
+        # Higher density areas have higher risk; an unknown density gets the full factor
+        density_factor = np.fmin(3.0, 1 + (population_density / 2000))  # Increased density effect
+        adjusted_risk_ratio = risk_ratio * density_factor
+    
+    # Ratios above every threshold, or undefined (NaN), are the highest risk
+    return np.select(
+        [adjusted_risk_ratio < risk_thresholds['low'],
+         adjusted_risk_ratio < risk_thresholds['medium'],
+         adjusted_risk_ratio < risk_thresholds['high']],
+        [1, 3, 7],
+        default=10
+    )
+
 class FluDataProcessor:
     def __init__(self):
         self.data = None
@@ -52,20 +92,33 @@ class FluDataProcessor:
             'Regina': 179.2
         }
     
+    @timed("processor.load")
     def load_data(self, source):
-        """Load data from either a CSV file or database"""
+        """Load data from a CSV file, sales dataset or database"""
         if isinstance(source, str) and source.endswith('.csv'):
             return self.load_data_from_csv(source)
         elif source == 'database':
             return self.load_data_from_db()
+        elif isinstance(source, str) and os.path.isdir(source):
+            return self.load_data_from_dataset(source)
         else:
-            raise ValueError("Invalid data source. Use either a CSV file path or 'database'")
+            raise ValueError("Invalid data source. Use a CSV file path, a sales dataset directory or 'database'")
+    
+    def load_compact_data(self, source):
+        """Load data like load_data(), in the compact frame schema (city_key and `day` ordinals instead of `date`)"""
+        self.data = compact_sales_frame(self.load_data(source))
+        return self.data
     
     def load_data_from_csv(self, file_path):
         """Load data from a CSV file"""
         self.data = pd.read_csv(file_path)
         return self.data
     
+    def load_data_from_dataset(self, path, since=None, cities=None):
+        """Load data from a partitioned Parquet/Feather sales dataset (see columnar_store.py)"""
+        self.data = read_sales_dataset(path, since=since, cities=cities)
+        return self.data
+    
     def load_data_from_db(self):
         """Load data from the database"""
         with Session(engine) as session:
@@ -88,6 +141,7 @@ class FluDataProcessor:
             self.data = pd.DataFrame(data)
             return self.data
     
+    @timed("processor.preprocess")
     def preprocess_sales_data(self, data):
         """Preprocess pharmacy sales data"""
         # Convert date column to datetime if it exists
@@ -97,9 +151,7 @@ class FluDataProcessor:
         # Group by city and calculate features
         city_features = []
         
-        for city in data['city'].unique():
-            city_data = data[data['city'] == city]
-            
+        for city, city_data in data.groupby('city', sort=False, observed=True):
             # Calculate features
             features = {
                 'city': city,
@@ -108,13 +160,13 @@ class FluDataProcessor:
                 'avg_daily_sales': city_data['sales'].mean(),
                 'sales_std': city_data['sales'].std(),
                 'sales_trend': self._calculate_trend(city_data['sales']),
-                'peak_sales': city_data['sales'].max(),
+                'peak_sales': int(city_data['sales'].max()),
                 'sales_variance': city_data['sales'].var(),
                 'total_flu_cases': city_data['flu_cases'].sum(),
                 'avg_daily_flu_cases': city_data['flu_cases'].mean(),
                 'flu_cases_std': city_data['flu_cases'].std(),
                 'flu_cases_trend': self._calculate_trend(city_data['flu_cases']),
-                'peak_flu_cases': city_data['flu_cases'].max(),
+                'peak_flu_cases': int(city_data['flu_cases'].max()),
                 'flu_cases_variance': city_data['flu_cases'].var(),
                 'sales_flu_correlation': city_data['sales'].corr(city_data['flu_cases'])
             }
@@ -132,54 +184,16 @@ class FluDataProcessor:
         slope = np.polyfit(x, series, 1)[0]
         return slope
     
+    @timed("processor.create_target")
     def create_target(self, historical_data, risk_thresholds=None):
         """Create target variable (flu risk index) based on historical data"""
-        if risk_thresholds is None:
-            # Default thresholds based on normalized flu-to-sales ratio
-            risk_thresholds = {
-                'low': 0.1,    # 10% of normalized ratio
-                'medium': 0.2,  # 20% of normalized ratio
-                'high': 0.3    # 30% of normalized ratio
-            }
-        
-        # Calculate risk index based on normalized flu-to-sales ratio and population density
-        risk_index = []
-        
-        for city in self.features['city']:
-            city_data = historical_data[historical_data['city'] == city]
-            current_sales = self.features[self.features['city'] == city]['total_sales'].values[0]
-            current_flu = self.features[self.features['city'] == city]['total_flu_cases'].values[0]
-            population = self.features[self.features['city'] == city]['population'].values[0]
-            land_area = self.features[self.features['city'] == city]['land_area'].values[0]
-            
-            # Calculate population density (people per square km)
-            population_density = population / land_area
-            
-            # Calculate normalized values per capita
-            flu_per_capita = current_flu / population
-            sales_per_capita = current_sales / population
-            
-            # Calculate risk based on the ratio of normalized flu cases to normalized sales
-            # Higher ratio indicates higher risk
-            risk_ratio = flu_per_capita / sales_per_capita if sales_per_capita > 0 else 0
-            
-            # Adjust risk based on population density
-            # Higher density areas have higher risk
-            density_factor = min(3.0, 1 + (population_density / 2000))  # Increased density effect
-            adjusted_risk_ratio = risk_ratio * density_factor
-            
-            if adjusted_risk_ratio < risk_thresholds['low']:
-                risk = 1
-            elif adjusted_risk_ratio < risk_thresholds['medium']:
-                risk = 3
-            elif adjusted_risk_ratio < risk_thresholds['high']:
-                risk = 7
-            else:
-                risk = 10
-            
-            risk_index.append(risk)
-        
-        self.target = np.array(risk_index)
+        self.target = risk_levels(
+            self.features['total_sales'].to_numpy(dtype=np.float64),
+            self.features['total_flu_cases'].to_numpy(dtype=np.float64),
+            self.features['population'].to_numpy(dtype=np.float64),
+            self.features['land_area'].to_numpy(dtype=np.float64),
+            risk_thresholds
+        )
         return self.target
     
     def get_features_and_target(self):
@@ -201,6 +215,27 @@ class FluDataProcessor:
         features['land_area'] = features['city'].map(self.land_area_data)
         return features
 
+    def load_survey_features(self, end_date=None, days=14):
+        """Per-province survey responses and symptomatic share over the `days` days up to `end_date`, from the rollups"""
+        end_date = pd.Timestamp(end_date or datetime.utcnow()).date()
+        with Session(engine) as session:
+            daily = load_survey_rollups(session, end_date - timedelta(days=days - 1), end_date)
+        
+        survey_features = daily.groupby('province')[['responses', 'symptomatic']].sum().reset_index()
+        survey_features['survey_symptom_rate'] = survey_features['symptomatic'] / survey_features['responses']
+        return survey_features.rename(columns={'responses': 'survey_responses'})[
+            ['province', 'survey_responses', 'survey_symptom_rate']
+        ]
+
+    def add_survey_features(self, features, end_date=None, days=14, survey_features=None):
+        """Join per-province survey features onto city features; provinces without responses get 0"""
+        if survey_features is None:
+            survey_features = self.load_survey_features(end_date, days)
+        features = features.merge(survey_features, on='province', how='left')
+        features['survey_responses'] = features['survey_responses'].fillna(0).astype(np.int64)
+        features['survey_symptom_rate'] = features['survey_symptom_rate'].fillna(0.0).astype(np.float64)
+        return features
+
     def preprocess_data(self, X):
         """Scale features and convert to float32."""
         X_scaled = self.scaler.fit_transform(X)
@@ -1,5 +1,6 @@
 from .config import Base, engine, get_db
 from .models import User, Prediction, LocationData
-from .init_db import init_db
+from .init_db import init_db, upgrade_schema
+from .queries import load_recent_sales
 
-__all__ = ['Base', 'engine', 'get_db', 'User', 'Prediction', 'LocationData', 'init_db'] 
\ No newline at end of file
+__all__ = ['Base', 'engine', 'get_db', 'User', 'Prediction', 'LocationData', 'init_db', 'upgrade_schema', 'load_recent_sales'] 
\ No newline at end of file
@@ -3,6 +3,7 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 from .config import engine
 from .models import SalesData
+from .queries import sync_location_data
 
 def import_sales_data():
     # Read the CSV file
@@ -29,6 +30,9 @@ def import_sales_data():
             )
             session.add(sales_data)
         
+        # Keep the location list in step with the imported cities
+        sync_location_data(session, df)
+        
         # Commit the changes
         session.commit()
 
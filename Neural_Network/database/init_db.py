@@ -1,11 +1,39 @@
-from .config import engine, Base
-from .models import User, Prediction, LocationData
+from sqlalchemy import inspect, text
+
+from .config import engine
+from .models import Base, User, Prediction, LocationData, SurveySymptomRollup
+
+def upgrade_schema(bind=engine):
+    """Add the columns and indexes create_all skips on tables that already exist.
+
+    Only additive changes are applied, so it is safe to run on every start:
+    missing columns are added as nullable and missing indexes are created.
+    Constraint changes, such as NOT NULL on survey_responses.created_at, are
+    left to a manual migration.
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    preparer = bind.dialect.identifier_preparer
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    connection.execute(text(
+                        f"ALTER TABLE {preparer.format_table(table)} "
+                        f"ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=bind.dialect)}"
+                    ))
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
 
 def init_db():
-    # Create all tables
+    # Create all tables, then bring tables from older releases up to date
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
 
 if __name__ == "__main__":
     print("Creating database tables...")
     init_db()
-    print("Database tables created successfully!") 
\ No newline at end of file
+    print("Database tables created successfully!")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -17,6 +17,9 @@ class User(Base):
     
     # Relationship with survey responses
     survey_responses = relationship("SurveyResponse", back_populates="user")
+    
+    # Relationship with predictions
+    predictions = relationship("Prediction", back_populates="user")
 
 class SurveyResponse(Base):
     __tablename__ = "survey_responses"
@@ -32,26 +35,56 @@ class SurveyResponse(Base):
     timezone = Column(String, nullable=False)
     timestamp = Column(String, nullable=False)
     user_email = Column(String, ForeignKey("users.email"), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # Keyset cursors are (created_at, id), so every row needs a created_at
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     # Relationship with user
     user = relationship("User", back_populates="survey_responses")
 
+    # Keyset pagination index for per-user survey history; created_at alone for rollup rebuilds
+    __table_args__ = (
+        Index("ix_survey_responses_user_created_id", "user_email", "created_at", "id"),
+        Index("ix_survey_responses_created_at", "created_at"),
+    )
+
+class SurveySymptomRollup(Base):
+    __tablename__ = "survey_symptom_rollups"
+
+    # One counter per (day, province, postal prefix, symptom), kept in step with survey_responses
+    day = Column(Date, primary_key=True)
+    province = Column(String, primary_key=True)
+    postal_prefix = Column(String, primary_key=True)  # Forward sortation area, e.g. 'M5V'
+    symptom = Column(String, primary_key=True)  # A symptom, or '_responses' / '_symptomatic' totals
+    count = Column(Integer, nullable=False, default=0)
+
+    # Province/day range reads for the rollup endpoint and model features
+    __table_args__ = (
+        Index("ix_survey_symptom_rollups_province_day", "province", "day"),
+    )
+
 class Prediction(Base):
     __tablename__ = "predictions"
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     location = Column(String)
+    scope = Column(String)  # 'national', 'province' or 'city'
+    forecast_date = Column(Date)  # Day the risk applies to
+    horizon = Column(Integer)  # Days between the run and forecast_date, 0 for the current risk
     risk_score = Column(Float)
     confidence = Column(Float)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     weather_data = Column(String)  # Store as JSON string
     population_data = Column(String)  # Store as JSON string
     
     # Relationship with user
     user = relationship("User", back_populates="predictions")
 
+    # Latest-run lookups per location seek on (scope, location, timestamp)
+    __table_args__ = (
+        Index("ix_predictions_scope_location_timestamp", "scope", "location", "timestamp"),
+    )
+
 class LocationData(Base):
     __tablename__ = "location_data"
 
@@ -72,4 +105,9 @@ class SalesData(Base):
     sales = Column(Integer)
     flu_cases = Column(Integer)
     population = Column(Integer)
-    land_area = Column(Float) 
\ No newline at end of file
+    land_area = Column(Float)
+
+    # Recent-window and latest-per-city lookups seek on (city, date)
+    __table_args__ = (
+        Index("ix_sales_data_city_date", "city", "date"),
+    ) 
\ No newline at end of file
@@ -0,0 +1,379 @@
+import pandas as pd
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import select, union_all, insert, delete, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from .models import SalesData, LocationData, Prediction, SurveyResponse, SurveySymptomRollup
+
+SALES_COLUMNS = ['city', 'province', 'date', 'sales', 'flu_cases', 'population', 'land_area']
+
+# City centre coordinates used to seed location_data on import
+CITY_COORDINATES = {
+    'Toronto': (43.6532, -79.3832),
+    'Montreal': (45.5017, -73.5673),
+    'Vancouver': (49.2827, -123.1207),
+    'Calgary': (51.0447, -114.0719),
+    'Edmonton': (53.5461, -113.4938),
+    'Ottawa': (45.4215, -75.6972),
+    'Winnipeg': (49.8951, -97.1384),
+    'Quebec City': (46.8139, -71.2080),
+    'Hamilton': (43.2557, -79.8711),
+    'Kitchener': (43.4516, -80.4925),
+    'London': (42.9849, -81.2453),
+    'Victoria': (48.4284, -123.3656),
+    'Halifax': (44.6488, -63.5752),
+    'Saskatoon': (52.1579, -106.6702),
+    'Regina': (50.4452, -104.6189),
+    "St. John's": (47.5615, -52.7126),
+    'Kelowna': (49.8880, -119.4960),
+}
+
+# SQLite caps the number of terms in a compound SELECT
+UNION_CHUNK_SIZE = 200
+
+def _sales_columns():
+    return [getattr(SalesData, column) for column in SALES_COLUMNS]
+
+def _to_frame(rows):
+    data = pd.DataFrame(rows, columns=SALES_COLUMNS)
+    data['date'] = pd.to_datetime(data['date'])
+    return data
+
+def get_sales_cities(session: Session):
+    """Return the distinct cities in the sales table"""
+    stmt = select(SalesData.city).distinct().order_by(SalesData.city)
+    return [city for city in session.execute(stmt).scalars()]
+
+def get_location_names(session: Session):
+    """Return the location names stored in the location_data table"""
+    stmt = select(LocationData.location).where(LocationData.location.is_not(None))
+    return [location for location in session.execute(stmt).scalars()]
+
+def get_tracked_cities(session: Session):
+    """Return the cities to load sales for: location_data's names, kept in step with the sales import
+
+    DISTINCT over the sales table is a full index scan on PostgreSQL (no skip
+    scan), so it is only the fallback for databases without location_data rows.
+    """
+    return get_location_names(session) or get_sales_cities(session)
+
+def get_location_coordinates(session: Session):
+    """Return (location, latitude, longitude) for every location with stored coordinates"""
+    stmt = select(LocationData.location, LocationData.latitude, LocationData.longitude).where(
+        LocationData.latitude.is_not(None), LocationData.longitude.is_not(None)
+    )
+    return [tuple(row) for row in session.execute(stmt).all()]
+
+def sync_location_data(session: Session, sales_data: pd.DataFrame):
+    """Upsert one location_data row per city in `sales_data`, keeping stored coordinates"""
+    latest = sales_data.sort_values('date').groupby('city').tail(1)
+    existing = {location.location: location for location in session.query(LocationData).all()}
+    now = datetime.utcnow()
+    
+    for row in latest.itertuples(index=False):
+        location = existing.get(row.city)
+        if location is None:
+            location = LocationData(location=row.city)
+            session.add(location)
+        location.population = int(row.population)
+        if location.latitude is None and row.city in CITY_COORDINATES:
+            location.latitude, location.longitude = CITY_COORDINATES[row.city]
+        location.last_updated = now
+
+def load_sales_window(session: Session, since: datetime, cities=None):
+    """Load every sales row dated on or after `since`, one (city, date) index range per city"""
+    if cities is None:
+        cities = get_tracked_cities(session)
+    if not cities:
+        return _to_frame([])
+    
+    stmt = (
+        select(*_sales_columns())
+        .where(SalesData.city.in_(cities), SalesData.date >= since)
+        .order_by(SalesData.city, SalesData.date)
+    )
+    return _to_frame(session.execute(stmt).all())
+
+def load_latest_sales(session: Session, rows_per_city: int, cities=None):
+    """Load the most recent `rows_per_city` rows of each city, newest-first index seek per city"""
+    if cities is None:
+        cities = get_tracked_cities(session)
+    
+    rows = []
+    for start in range(0, len(cities), UNION_CHUNK_SIZE):
+        per_city = [
+            select(
+                select(*_sales_columns())
+                .where(SalesData.city == city)
+                .order_by(SalesData.date.desc())
+                .limit(rows_per_city)
+                .subquery()
+            )
+            for city in cities[start:start + UNION_CHUNK_SIZE]
+        ]
+        stmt = per_city[0] if len(per_city) == 1 else union_all(*per_city)
+        rows.extend(session.execute(stmt).all())
+    
+    data = _to_frame(rows)
+    return data.sort_values(['city', 'date']).reset_index(drop=True)
+
+def load_recent_sales(session: Session, current_date: datetime, days=7, fallback_rows=7, cities=None):
+    """Load the trailing `days` window, or the latest `fallback_rows` per city if the window is empty (0 for no fallback)"""
+    if cities is None:
+        cities = get_tracked_cities(session)
+    recent_data = load_sales_window(session, current_date - timedelta(days=days), cities)
+    if recent_data.empty and fallback_rows:
+        recent_data = load_latest_sales(session, fallback_rows, cities)
+    return recent_data
+
+def prediction_rows(risk_data, computed_at: datetime):
+    """Flatten a get_flu_risk_data() result into predictions rows sharing one timestamp"""
+    # Forecast days are local dates while computed_at is UTC; the run's day is
+    # the payload's first forecast day, so horizon 0 is the current risk on any host
+    first_days = [min(city_future_risks) for city_future_risks in risk_data['future_risks'].values() if city_future_risks]
+    run_date = datetime.strptime(min(first_days), '%Y-%m-%d').date() if first_days else computed_at.date()
+    rows = [{
+        'scope': 'national', 'location': 'Canada', 'forecast_date': run_date, 'horizon': 0,
+        'risk_score': float(risk_data['national_risk']), 'timestamp': computed_at
+    }]
+    for province, risk in risk_data['provincial_risks'].items():
+        rows.append({
+            'scope': 'province', 'location': province, 'forecast_date': run_date, 'horizon': 0,
+            'risk_score': float(risk), 'timestamp': computed_at
+        })
+    # The first forecast day is the current city risk
+    for city, city_future_risks in risk_data['future_risks'].items():
+        for day, risk in city_future_risks.items():
+            forecast_date = datetime.strptime(day, '%Y-%m-%d').date()
+            rows.append({
+                'scope': 'city', 'location': city, 'forecast_date': forecast_date,
+                'horizon': (forecast_date - run_date).days, 'risk_score': float(risk), 'timestamp': computed_at
+            })
+    return rows
+
+def save_predictions(session: Session, risk_data, computed_at: datetime):
+    """Bulk-insert one risk run into the predictions table"""
+    rows = prediction_rows(risk_data, computed_at)
+    session.execute(insert(Prediction), rows)
+    session.commit()
+    return len(rows)
+
+def get_latest_prediction_time(session: Session):
+    """Return the timestamp of the latest stored run, or None"""
+    stmt = select(func.max(Prediction.timestamp)).where(Prediction.scope == 'national')
+    return session.execute(stmt).scalar()
+
+def load_latest_predictions(session: Session):
+    """Rebuild the get_flu_risk_data() payload from the latest stored run, or None if there is none"""
+    computed_at = get_latest_prediction_time(session)
+    if computed_at is None:
+        return None
+    
+    stmt = select(Prediction.scope, Prediction.location, Prediction.forecast_date, Prediction.risk_score).where(
+        Prediction.timestamp == computed_at
+    ).order_by(Prediction.scope, Prediction.location, Prediction.forecast_date)
+    
+    payload = {"national_risk": None, "current_city_risks": {}, "provincial_risks": {}, "future_risks": {}}
+    for scope, location, forecast_date, risk in session.execute(stmt):
+        if scope == 'national':
+            payload["national_risk"] = risk
+        elif scope == 'province':
+            payload["provincial_risks"][location] = risk
+        else:
+            city_future_risks = payload["future_risks"].setdefault(location, {})
+            city_future_risks[forecast_date.strftime('%Y-%m-%d')] = risk
+    
+    for city, city_future_risks in payload["future_risks"].items():
+        payload["current_city_risks"][city] = city_future_risks[min(city_future_risks)]
+    payload["computed_at"] = computed_at
+    return payload
+
+def load_latest_city_prediction(session: Session, city: str):
+    """Return the latest stored current/future risks for one city, or None"""
+    latest = select(func.max(Prediction.timestamp)).where(
+        Prediction.scope == 'city', Prediction.location == city
+    ).scalar_subquery()
+    stmt = select(Prediction.forecast_date, Prediction.risk_score, Prediction.timestamp).where(
+        Prediction.scope == 'city', Prediction.location == city, Prediction.timestamp == latest
+    ).order_by(Prediction.forecast_date)
+    
+    rows = session.execute(stmt).all()
+    if not rows:
+        return None
+    return {
+        "current_risk": rows[0].risk_score,
+        "future_risks": {row.forecast_date.strftime('%Y-%m-%d'): row.risk_score for row in rows},
+        "computed_at": rows[0].timestamp
+    }
+
+HISTORY_COLUMNS = ['date', 'min', 'mean', 'max', 'count']
+
+def load_risk_history(session: Session, scope: str, location: str, start: date = None, end: date = None):
+    """Daily min/mean/max of the current (horizon 0) risk for one location between two days (inclusive)
+
+    A horizon 0 row's forecast_date is the local day of its run, so it is both
+    the daily bucket and the range filter. Timestamps are UTC and within a day
+    of that local day, so a range one day wider on each side still seeks on
+    the (scope, location, timestamp) index without cutting off any bucket.
+    """
+    conditions = [Prediction.scope == scope, Prediction.location == location, Prediction.horizon == 0]
+    if start is not None:
+        conditions.append(Prediction.forecast_date >= start)
+        conditions.append(Prediction.timestamp >= datetime.combine(start - timedelta(days=1), time.min))
+    if end is not None:
+        conditions.append(Prediction.forecast_date <= end)
+        conditions.append(Prediction.timestamp < datetime.combine(end + timedelta(days=2), time.min))
+    
+    stmt = select(
+        Prediction.forecast_date,
+        func.min(Prediction.risk_score),
+        func.avg(Prediction.risk_score),
+        func.max(Prediction.risk_score),
+        func.count(Prediction.id)
+    ).where(*conditions).group_by(Prediction.forecast_date).order_by(Prediction.forecast_date)
+    
+    data = pd.DataFrame(session.execute(stmt).all(), columns=HISTORY_COLUMNS)
+    data['date'] = pd.to_datetime(data['date'])
+    return data
+
+def downsample_risk_history(daily: pd.DataFrame, resolution: str = 'day'):
+    """Roll daily buckets up to Monday-started weeks, weighting each day's mean by its run count"""
+    if resolution == 'day' or daily.empty:
+        return daily
+    
+    weekly = daily.assign(
+        date=daily['date'] - pd.to_timedelta(daily['date'].dt.weekday, unit='D'),
+        total=daily['mean'] * daily['count']
+    ).groupby('date', sort=True).agg(
+        min=('min', 'min'), max=('max', 'max'), total=('total', 'sum'), count=('count', 'sum')
+    ).reset_index()
+    weekly['mean'] = weekly['total'] / weekly['count']
+    return weekly[HISTORY_COLUMNS]
+
+
+# Rollup rows that count responses rather than one symptom
+ROLLUP_RESPONSES = '_responses'
+ROLLUP_SYMPTOMATIC = '_symptomatic'
+NO_SYMPTOMS = {'', 'none', 'no symptoms'}
+
+# Rows per multi-row upsert, well under SQLite's bound parameter limit
+ROLLUP_UPSERT_CHUNK_SIZE = 150
+
+def parse_symptoms(symptoms: str):
+    """Split a comma-separated symptoms answer into distinct lower-case symptoms, ignoring 'none'"""
+    names = {part.strip().lower() for part in (symptoms or '').split(',')}
+    return sorted(names - NO_SYMPTOMS)
+
+def postal_prefix(postal_code: str):
+    """Forward sortation area (first three characters) of a Canadian postal code"""
+    return (postal_code or '').replace(' ', '').upper()[:3]
+
+def survey_rollup_counts(surveys):
+    """Count (day, province, postal prefix, symptom) over (created_at, province, postal_code, symptoms) rows"""
+    counts = Counter()
+    for created_at, province, postal_code, symptoms in surveys:
+        key = (created_at.date(), province, postal_prefix(postal_code))
+        names = parse_symptoms(symptoms)
+        counts[key + (ROLLUP_RESPONSES,)] += 1
+        if names:
+            counts[key + (ROLLUP_SYMPTOMATIC,)] += 1
+        for name in names:
+            counts[key + (name,)] += 1
+    return counts
+
+def add_rollup_counts(session: Session, counts, replace=False):
+    """Add counts to survey_symptom_rollups (or overwrite them with `replace`), inserting missing rows, without committing
+
+    PostgreSQL and SQLite add in one INSERT ... ON CONFLICT per chunk, so
+    concurrent writers never lose increments; rows go in key order so they
+    also take row locks in the same order.
+    """
+    rows = [
+        {'day': day, 'province': province, 'postal_prefix': prefix, 'symptom': symptom, 'count': count}
+        for (day, province, prefix, symptom), count in sorted(counts.items())
+    ]
+    dialect = session.get_bind().dialect.name
+    if dialect not in ('postgresql', 'sqlite'):
+        for row in rows:
+            key = (row['day'], row['province'], row['postal_prefix'], row['symptom'])
+            rollup = session.get(SurveySymptomRollup, key)
+            if rollup is None:
+                session.add(SurveySymptomRollup(**row))
+            else:
+                rollup.count = row['count'] if replace else rollup.count + row['count']
+        return len(rows)
+    
+    dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    for start in range(0, len(rows), ROLLUP_UPSERT_CHUNK_SIZE):
+        stmt = dialect_insert(SurveySymptomRollup).values(rows[start:start + ROLLUP_UPSERT_CHUNK_SIZE])
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=['day', 'province', 'postal_prefix', 'symptom'],
+            set_={'count': stmt.excluded['count'] if replace else SurveySymptomRollup.count + stmt.excluded['count']}
+        ))
+    return len(rows)
+
+def record_survey_rollup(session: Session, survey: SurveyResponse):
+    """Count one new (flushed) survey response into the rollups, in the caller's transaction"""
+    counts = survey_rollup_counts([(survey.created_at, survey.province, survey.postal_code, survey.symptoms)])
+    return add_rollup_counts(session, counts)
+
+def rebuild_survey_rollups(session: Session, since: datetime = None, batch_size=5000):
+    """Recount the rollups for every day from `since` (all days if None) from survey_responses and commit
+
+    Responses are read in created_at order through the created_at index, in
+    batches, so the cost follows the number of responses in the window.
+    """
+    first_day = since.date() if since is not None else None
+    delete_stmt = delete(SurveySymptomRollup)
+    stmt = select(SurveyResponse.created_at, SurveyResponse.province, SurveyResponse.postal_code, SurveyResponse.symptoms)
+    if first_day is not None:
+        delete_stmt = delete_stmt.where(SurveySymptomRollup.day >= first_day)
+        stmt = stmt.where(SurveyResponse.created_at >= datetime.combine(first_day, datetime.min.time()))
+    
+    counts = Counter()
+    for partition in session.execute(stmt.order_by(SurveyResponse.created_at).execution_options(yield_per=batch_size)).partitions():
+        counts.update(survey_rollup_counts(partition))
+    
+    # Overwrite rather than add, so a rebuild overlapping another one cannot double its counts
+    session.execute(delete_stmt)
+    rows = add_rollup_counts(session, counts, replace=True)
+    session.commit()
+    return rows
+
+def load_survey_rollups(session: Session, start=None, end=None, province: str = None, prefix: str = None,
+                        by_prefix: bool = False):
+    """Daily symptom counts per province (or per postal prefix), one column per symptom
+
+    Returns columns date, province, [postal_prefix,] responses, symptomatic and
+    one count column per symptom seen in the range.
+    """
+    keys = [SurveySymptomRollup.day, SurveySymptomRollup.province]
+    if by_prefix:
+        keys.append(SurveySymptomRollup.postal_prefix)
+    conditions = []
+    if start is not None:
+        conditions.append(SurveySymptomRollup.day >= start)
+    if end is not None:
+        conditions.append(SurveySymptomRollup.day <= end)
+    if province is not None:
+        conditions.append(SurveySymptomRollup.province == province)
+    if prefix is not None:
+        conditions.append(SurveySymptomRollup.postal_prefix == postal_prefix(prefix))
+    
+    stmt = select(*keys, SurveySymptomRollup.symptom, func.sum(SurveySymptomRollup.count)).where(
+        *conditions
+    ).group_by(*keys, SurveySymptomRollup.symptom)
+    
+    index = ['date', 'province'] + (['postal_prefix'] if by_prefix else [])
+    counts = pd.DataFrame(session.execute(stmt).all(), columns=index + ['symptom', 'count'])
+    data = counts.pivot_table(index=index, columns='symptom', values='count', aggfunc='sum', fill_value=0)
+    data = data.rename(columns={ROLLUP_RESPONSES: 'responses', ROLLUP_SYMPTOMATIC: 'symptomatic'})
+    for column in ('responses', 'symptomatic'):
+        if column not in data.columns:
+            data[column] = 0
+    symptoms = sorted(column for column in data.columns if column not in ('responses', 'symptomatic'))
+    data = data[['responses', 'symptomatic'] + symptoms].reset_index()
+    data.columns.name = None
+    data['date'] = pd.to_datetime(data['date'])
+    return data.sort_values(index).reset_index(drop=True)
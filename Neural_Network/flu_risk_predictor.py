@@ -1,5 +1,6 @@
 import os
 import sys
+import json
 import numpy as np
 import pandas as pd
 import keras
@@ -17,6 +18,12 @@ import pytz
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from data_processor import FluDataProcessor
+from metrics import timed
+from profiling import profiled
+
+# Files written by FluRiskPredictor.save()
+MODEL_FILE = 'model.keras'
+METADATA_FILE = 'metadata.json'
 
 class FluRiskPredictor:
     def __init__(self):
@@ -51,6 +58,8 @@ class FluRiskPredictor:
         self.scaler.fit(data)
         return self.scaler.transform(data)
     
+    @profiled("predictor.train")
+    @timed("predictor.train")
     def train(self, X, y, epochs=100, batch_size=32, validation_split=0.2):
         """Train the model on the provided data"""
         if self.model is None:
@@ -66,11 +75,57 @@ class FluRiskPredictor:
         
         return self.history
     
-    def predict(self, X):
+    @profiled("predictor.train_windows")
+    @timed("predictor.train_windows")
+    def train_windows(self, dataset, epochs=10, batch_size=1024, validation_split=0.2):
+        """Train on a window_features.WindowDataset, streaming shuffled batches instead of holding X in memory
+
+        The features are standardized with a scaler fitted on the training
+        windows only; it is kept in self.scaler for scoring.
+        """
+        train, validation = dataset.split(validation_split)
+        if len(train) == 0:
+            raise ValueError("No training windows: no city has window + horizon consecutive days and a known population")
+        if self.model is None:
+            self.build_model((dataset.input_dim,))
+        
+        self.scaler = train.fit_scaler()
+        validation.scaler = self.scaler
+        self.history = self.model.fit(
+            train.batches(batch_size, repeat=True),
+            steps_per_epoch=train.steps(batch_size),
+            validation_data=validation.batches(batch_size, shuffle=False, repeat=True) if len(validation) else None,
+            validation_steps=validation.steps(batch_size) if len(validation) else None,
+            epochs=epochs,
+            verbose=1
+        )
+        
+        return self.history
+    
+    @timed("predictor.predict")
+    def predict(self, X, batch_size=None, verbose='auto'):
         """Make predictions using the trained model"""
         if self.model is None:
             raise ValueError("Model has not been trained yet")
-        return self.model.predict(X)
+        return self.model.predict(X, batch_size=batch_size, verbose=verbose)
+    
+    def save(self, directory, metadata=None):
+        """Save the trained network and the metadata needed to score with it"""
+        if self.model is None:
+            raise ValueError("Model has not been trained yet")
+        os.makedirs(directory, exist_ok=True)
+        self.model.save(os.path.join(directory, MODEL_FILE))
+        with open(os.path.join(directory, METADATA_FILE), 'w') as metadata_file:
+            json.dump(dict(metadata or {}, saved_at=datetime.now().isoformat()), metadata_file, indent=2)
+    
+    @classmethod
+    def load(cls, directory):
+        """Load a predictor written by save(); returns (predictor, metadata)"""
+        predictor = cls()
+        predictor.model = keras.models.load_model(os.path.join(directory, MODEL_FILE))
+        with open(os.path.join(directory, METADATA_FILE)) as metadata_file:
+            metadata = json.load(metadata_file)
+        return predictor, metadata
     
     def normalize_risk(self, risk_value, min_risk=0, max_risk=10):
         """Normalize risk value to be between 1 and 10 with more realistic distribution"""
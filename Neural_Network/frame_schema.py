@@ -0,0 +1,95 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+# Day ordinals count days since the Unix epoch
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+COUNT_COLUMNS = ['sales', 'flu_cases', 'population']
+
+def _lowercase_keys(city):
+    # Lower-case the categories once instead of every row
+    lowered = city.cat.categories.str.lower()
+    keys = pd.Index(lowered).unique()
+    codes = keys.get_indexer(lowered)[city.cat.codes]
+    codes[city.cat.codes.to_numpy() < 0] = -1
+    return pd.Categorical.from_codes(codes, categories=keys)
+
+def to_day_ordinals(dates):
+    """Convert dates to int32 days since 1970-01-01"""
+    days = pd.to_datetime(dates).to_numpy().astype('datetime64[D]')
+    return (days - EPOCH).astype(np.int32)
+
+def from_day_ordinals(days):
+    """Convert int32 day ordinals back to datetime64 dates"""
+    return pd.to_datetime(EPOCH + np.asarray(days).astype('timedelta64[D]'))
+
+def compact_sales_frame(data):
+    """Normalize a sales frame to the shared in-memory schema
+
+    city/province become categoricals, city_key holds the lower-cased city as a
+    categorical for cheap lookups, counts and land area are narrowed to the
+    smallest dtype that holds them and date is replaced by a `day` ordinal.
+    """
+    data = data.reset_index(drop=True)
+    compact = pd.DataFrame(index=data.index)
+
+    city = data['city'].astype('category')
+    compact['city'] = city
+    compact['city_key'] = _lowercase_keys(city)
+    if 'province' in data.columns:
+        compact['province'] = data['province'].astype('category')
+    if 'date' in data.columns:
+        compact['day'] = to_day_ordinals(data['date'])
+    elif 'day' in data.columns:
+        compact['day'] = data['day'].astype(np.int32)
+
+    for column in COUNT_COLUMNS:
+        if column in data.columns:
+            compact[column] = pd.to_numeric(data[column], downcast='integer')
+    if 'land_area' in data.columns:
+        compact['land_area'] = pd.to_numeric(data['land_area'], downcast='float')
+
+    # Keep any other columns as they are
+    for column in data.columns:
+        if column not in compact.columns and column != 'date':
+            compact[column] = data[column]
+
+    return compact
+
+def bytes_per_row(data):
+    """Deep memory usage of a frame divided by its row count"""
+    return data.memory_usage(deep=True, index=False).sum() / max(len(data), 1)
+
+def memory_report(data):
+    """Compare the per-column and per-row memory of a raw frame against its compact form"""
+    compact = compact_sales_frame(data)
+    raw_columns = data.memory_usage(deep=True, index=False)
+    compact_columns = compact.memory_usage(deep=True, index=False)
+    return {
+        'rows': len(data),
+        'bytes_per_row_before': round(float(bytes_per_row(data)), 1),
+        'bytes_per_row_after': round(float(bytes_per_row(compact)), 1),
+        'columns_before': {column: int(size) for column, size in raw_columns.items()},
+        'columns_after': {column: int(size) for column, size in compact_columns.items()},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Report sales frame memory before and after compaction')
+    parser.add_argument('path', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'sales_data.csv'))
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.path)
+    data['date'] = pd.to_datetime(data['date'])
+    report = memory_report(data)
+
+    print(f"Rows: {report['rows']}")
+    print(f"Bytes per row: {report['bytes_per_row_before']} -> {report['bytes_per_row_after']}")
+    for column in sorted(set(report['columns_before']) | set(report['columns_after'])):
+        before = report['columns_before'].get(column, 0)
+        after = report['columns_after'].get(column, 0)
+        print(f"  {column:>12}: {before:>10} -> {after:>10} bytes")
+
+if __name__ == "__main__":
+    main()
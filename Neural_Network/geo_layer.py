@@ -0,0 +1,138 @@
+import gzip
+import hashlib
+import json
+import threading
+import time
+
+# ~11 m for city points, ~110 m for simplified province outlines
+POINT_PRECISION = 4
+POLYGON_PRECISION = 3
+
+# Fallback province positions when no boundary file is configured
+PROVINCE_CENTROIDS = {
+    'Alberta': (55.0, -115.0),
+    'British Columbia': (53.7, -127.6),
+    'Manitoba': (53.8, -98.8),
+    'New Brunswick': (46.5, -66.2),
+    'Newfoundland and Labrador': (53.1, -57.7),
+    'Nova Scotia': (44.7, -63.7),
+    'Ontario': (50.0, -85.3),
+    'Prince Edward Island': (46.5, -63.4),
+    'Quebec': (52.9, -73.5),
+    'Saskatchewan': (52.9, -106.5),
+    'Northwest Territories': (64.8, -124.8),
+    'Nunavut': (70.3, -83.1),
+    'Yukon': (64.3, -135.0),
+}
+
+def risk_level(risk):
+    """Map a 1-10 risk to the labels used by the dashboard"""
+    if risk <= 3:
+        return "Low"
+    if risk <= 6:
+        return "Moderate"
+    if risk <= 8:
+        return "High"
+    return "Very High"
+
+def _round_coordinates(coordinates, precision):
+    if isinstance(coordinates[0], (int, float)):
+        return [round(value, precision) for value in coordinates]
+    return [_round_coordinates(part, precision) for part in coordinates]
+
+def _feature(geometry, name, kind, risk):
+    return {
+        "type": "Feature",
+        "geometry": geometry,
+        "properties": {"name": name, "kind": kind, "risk": round(float(risk), 2), "level": risk_level(risk)}
+    }
+
+def load_province_boundaries(path, tolerance=0.01):
+    """Read province polygons with geopandas, simplify them and return name -> GeoJSON geometry"""
+    import geopandas as gpd
+    from shapely.geometry import mapping
+
+    provinces = gpd.read_file(path).to_crs(epsg=4326)
+    name_column = next(column for column in ('name', 'PRENAME', 'PRNAME') if column in provinces.columns)
+    provinces['geometry'] = provinces.geometry.simplify(tolerance, preserve_topology=True)
+
+    boundaries = {}
+    for name, geometry in zip(provinces[name_column], provinces.geometry):
+        shape = mapping(geometry)
+        boundaries[name] = {"type": shape["type"], "coordinates": _round_coordinates(shape["coordinates"], POLYGON_PRECISION)}
+    return boundaries
+
+def build_risk_layer(risk_data, city_coordinates, province_boundaries=None):
+    """Build a FeatureCollection of province and city risks
+
+    city_coordinates maps the lower-cased city keys of risk_data to (display name, lat, lon).
+    """
+    features = []
+
+    for province, risk in risk_data["provincial_risks"].items():
+        if province_boundaries and province in province_boundaries:
+            geometry = province_boundaries[province]
+        elif province in PROVINCE_CENTROIDS:
+            lat, lon = PROVINCE_CENTROIDS[province]
+            geometry = {"type": "Point", "coordinates": [lon, lat]}
+        else:
+            continue
+        features.append(_feature(geometry, province, "province", risk))
+
+    for city, risk in risk_data["current_city_risks"].items():
+        if city not in city_coordinates:
+            continue
+        name, lat, lon = city_coordinates[city]
+        geometry = {"type": "Point", "coordinates": _round_coordinates([lon, lat], POINT_PRECISION)}
+        features.append(_feature(geometry, name, "city", risk))
+
+    return {
+        "type": "FeatureCollection",
+        "properties": {"national_risk": round(float(risk_data["national_risk"]), 2)},
+        "features": features
+    }
+
+class CachedLayer:
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=6)
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        self.built_at = time.monotonic()
+
+class RiskLayerCache:
+    def __init__(self, builder, ttl=300):
+        self.builder = builder
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._layer = None
+        # Fast-path hits happen outside _lock, on several threadpool workers at once
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _record(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _is_fresh(self, layer, version):
+        return layer is not None and layer.version == version and time.monotonic() - layer.built_at <= self.ttl
+
+    def get(self, version):
+        """Return the cached layer for `version`, building it once if it is missing or expired"""
+        layer = self._layer
+        if self._is_fresh(layer, version):
+            self._record(True)
+            return layer
+        with self._lock:
+            # Another request may have rebuilt it while we waited
+            if self._is_fresh(self._layer, version):
+                self._record(True)
+            else:
+                self._record(False)
+                body = json.dumps(self.builder(), separators=(',', ':')).encode('utf-8')
+                self._layer = CachedLayer(version, body)
+            return self._layer
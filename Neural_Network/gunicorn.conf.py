@@ -0,0 +1,29 @@
+import os
+import sys
+import subprocess
+
+# Multi-worker mode: one builder process publishes the risk snapshot and every
+# worker maps the same file instead of computing its own copy
+#
+#   gunicorn -c gunicorn.conf.py api:app
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Workers inherit the snapshot directory from the master's environment
+snapshot_dir = os.environ.setdefault("RISK_SNAPSHOT_DIR", "/tmp/flu_risk_snapshots")
+snapshot_interval = os.getenv("RISK_SNAPSHOT_INTERVAL", "300")
+
+builder = None
+
+def when_ready(server):
+    global builder
+    builder_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shared_snapshot.py")
+    builder = subprocess.Popen([sys.executable, builder_script, "--dir", snapshot_dir, "--interval", snapshot_interval])
+    server.log.info(f"Started risk snapshot builder (pid {builder.pid}) publishing to {snapshot_dir}")
+
+def on_exit(server):
+    if builder is not None:
+        builder.terminate()
+        builder.wait()
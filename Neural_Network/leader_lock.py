@@ -0,0 +1,42 @@
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows; every process leads, which is fine for a single dev server
+    fcntl = None
+
+class LeaderLock:
+    """Non-blocking exclusive lock on a file, held by at most one process on the host
+
+    The OS drops the lock when its holder exits, so after a crash the next
+    process to call acquire() takes over.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def acquire(self):
+        """Take the lock if no other process holds it; returns whether this process holds it"""
+        if self._file is not None:
+            return True
+        lock_file = open(self.path, 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
@@ -0,0 +1,203 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+import numpy as np
+import httpx
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+LOCATIONS = ['Toronto', 'Montreal', 'Vancouver', 'Calgary', 'Edmonton', 'Ottawa', 'Winnipeg', 'Halifax']
+
+# Signed up once before the run so signin calls succeed
+LOAD_TEST_USER = {"name": "Load Test", "email": "load-test@example.com", "password": "load-test-password", "city": "Toronto"}
+
+DEFAULT_MIX = 'flu-risk=4,flu-risk-city=4,locations=2,survey=1,signin=0.5,signup=0.1'
+
+def _survey(rng):
+    return {
+        "age": rng.randint(18, 90),
+        "postalCode": rng.choice(['M5V 2T6', 'H2X 1Y4', 'V6B 1A1', 'T2P 1J9']),
+        "organization": "Load Test",
+        "organizationType": "school",
+        "symptoms": rng.choice(['none', 'fever', 'cough,fever', 'sore throat']),
+        "province": rng.choice(['Ontario', 'Quebec', 'British Columbia', 'Alberta']),
+        "submissionId": str(uuid.uuid4()),
+        "timezone": "America/Toronto",
+        "timestamp": datetime.now().isoformat(),
+        "userEmail": LOAD_TEST_USER["email"]
+    }
+
+# Endpoint name -> (method, path, JSON body) for one request
+ENDPOINTS = {
+    'flu-risk': lambda rng: ('GET', '/api/flu-risk', None),
+    'flu-risk-city': lambda rng: ('GET', f'/api/flu-risk/{rng.choice(LOCATIONS)}', None),
+    'locations': lambda rng: ('GET', '/api/locations', None),
+    'survey': lambda rng: ('POST', '/api/survey', _survey(rng)),
+    'signin': lambda rng: ('POST', '/api/auth/signin', {"email": LOAD_TEST_USER["email"], "password": LOAD_TEST_USER["password"]}),
+    'signup': lambda rng: ('POST', '/api/auth/signup', dict(LOAD_TEST_USER, email=f"load-{uuid.uuid4().hex}@example.com")),
+}
+
+def parse_mix(mix):
+    """Parse 'name=weight,...' into a dict of endpoint weights"""
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}'; choose from {', '.join(ENDPOINTS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(database_path, workers=1, env_overrides=None):
+    """Start the app with uvicorn on a free port against a SQLite file; returns (process, base URL)"""
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database_path}", **(env_overrides or {}))
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api:app', '--host', '127.0.0.1', '--port', str(port),
+         '--workers', str(workers), '--log-level', 'warning'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            httpx.get(base_url + '/api/locations', timeout=5)
+            return process, base_url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not start within 60 seconds")
+
+def percentiles(latencies):
+    if not latencies:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {'p50_ms': round(p50, 2), 'p95_ms': round(p95, 2), 'p99_ms': round(p99, 2), 'max_ms': round(max(latencies) * 1000, 2)}
+
+def summarize(samples, duration):
+    """Throughput, error rate and latency percentiles per endpoint and overall"""
+    by_endpoint = {}
+    for name, latency, ok in samples:
+        by_endpoint.setdefault(name, []).append((latency, ok))
+    by_endpoint['all'] = [(latency, ok) for _, latency, ok in samples]
+
+    report = {}
+    for name, results in by_endpoint.items():
+        errors = sum(1 for _, ok in results if not ok)
+        report[name] = {
+            'requests': len(results),
+            'throughput_rps': round(len(results) / duration, 2),
+            'error_rate': round(errors / len(results), 4) if results else 0.0,
+            **percentiles([latency for latency, _ in results])
+        }
+    return report
+
+async def run_load(base_url, weights, rps, duration, warmup=0.0, max_in_flight=256, timeout=30.0, seed=42):
+    """Send requests at a fixed arrival rate for `duration` seconds and collect (endpoint, latency, ok)
+
+    Arrivals are open-loop: each request is scheduled at its slot whether or not
+    earlier ones finished, and latency is measured from the scheduled time, so a
+    stalled server shows up as latency instead of as a lower send rate.
+    """
+    rng = random.Random(seed)
+    names = list(weights)
+    samples = []
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        await client.post('/api/auth/signup', json=LOAD_TEST_USER)
+
+        async def send(name, scheduled, record):
+            method, path, body = ENDPOINTS[name](rng)
+            try:
+                response = await client.request(method, path, json=body)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if record:
+                samples.append((name, time.perf_counter() - scheduled, ok))
+
+        tasks = []
+        start = time.perf_counter()
+        total = int((warmup + duration) * rps)
+        for i in range(total):
+            scheduled = start + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            name = rng.choices(names, weights=[weights[name] for name in names])[0]
+            tasks.append(asyncio.create_task(send(name, scheduled, record=i >= warmup * rps)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start - warmup
+
+    return samples, max(elapsed, duration)
+
+def print_report(report):
+    print(f"{'endpoint':<15}{'requests':>9}{'rps':>9}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in sorted(report.items(), key=lambda item: item[0] == 'all'):
+        values = [stats[key] if stats[key] is not None else float('nan') for key in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms')]
+        print(f"{name:<15}{stats['requests']:>9}{stats['throughput_rps']:>9.1f}{stats['error_rate']:>9.1%}"
+              + ''.join(f"{value:>10.1f}" for value in values))
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Load test the flu risk API at a target request rate')
+    parser.add_argument('--url', help='Test a running server instead of starting one')
+    parser.add_argument('--rps', type=float, default=50, help='Target requests per second')
+    parser.add_argument('--duration', type=float, default=30, help='Measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='Unmeasured seconds before the run')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn workers for the local server')
+    parser.add_argument('--max-in-flight', type=int, default=256)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Also write the report as JSON')
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    weights = parse_mix(args.mix)
+
+    process = None
+    with tempfile.TemporaryDirectory() as database_dir:
+        try:
+            if args.url:
+                base_url = args.url.rstrip('/')
+            else:
+                # A throwaway SQLite database stands in for PostgreSQL
+                process, base_url = start_server(os.path.join(database_dir, 'load_test.db'), args.workers)
+            print(f"Load testing {base_url} at {args.rps:g} req/s for {args.duration:g}s (+{args.warmup:g}s warmup)")
+
+            samples, elapsed = asyncio.run(run_load(
+                base_url, weights, args.rps, args.duration, args.warmup, args.max_in_flight, args.timeout, args.seed
+            ))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    report = summarize(samples, elapsed)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({'url': base_url, 'rps': args.rps, 'duration': args.duration, 'mix': weights, 'endpoints': report}, output_file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import bisect
+import heapq
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, namedtuple
+
+# Common place-name abbreviations, so "Saint John's" and "St. John's" index alike
+ABBREVIATIONS = {
+    'saint': 'st',
+    'sainte': 'ste',
+    'mount': 'mt',
+    'fort': 'ft',
+    'port': 'pt',
+}
+
+# Number of longer, prefix-only candidates (ranked by shared trigrams) that get an edit-distance check
+FUZZY_CANDIDATES = 50
+
+_CatalogState = namedtuple('_CatalogState', [
+    'names',           # sorted location names
+    'keys',            # lower-cased names, parallel to names
+    'by_key',          # lower-cased or normalized name -> name
+    'version',
+    'normalized',      # normalized name per name index
+    'full_keys',       # sorted normalized names
+    'full_ids',        # name index per full_keys entry
+    'token_keys',      # sorted normalized suffixes starting at each later word
+    'token_ids',       # name index per token_keys entry
+    'trigrams',        # trigram -> name indices
+])
+
+def normalize_location(name):
+    """Fold accents, case, punctuation and common abbreviations out of a place name"""
+    text = unicodedata.normalize('NFKD', name)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = re.sub("['\u2019`]", '', text)
+    tokens = re.sub(r'[^a-z0-9]+', ' ', text).split()
+    return ' '.join(ABBREVIATIONS.get(token, token) for token in tokens)
+
+def _trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def bounded_edit_distance(a, b, max_distance):
+    """Edit distance (with adjacent transpositions) between `a` and `b`, capped at max_distance + 1"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb)
+            )
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > max_distance:
+            return max_distance + 1
+        before, previous = previous, current
+    return previous[-1]
+
+def _prefix_range(keys, prefix):
+    start = bisect.bisect_left(keys, prefix)
+    end = bisect.bisect_right(keys, prefix + '\uffff', lo=start)
+    return start, end
+
+def _build_state(loaded_names):
+    # A tuple, so names() can hand out the shared sequence without copying it
+    names = tuple(sorted(set(loaded_names), key=lambda name: (name.lower(), name)))
+    keys = [name.lower() for name in names]
+    normalized = [normalize_location(name) for name in names]
+    version = hashlib.sha1("\n".join(names).encode('utf-8')).hexdigest()[:16]
+
+    full_index = sorted((key, i) for i, key in enumerate(normalized))
+    token_index = []
+    trigrams = {}
+    for i, key in enumerate(normalized):
+        tokens = key.split()
+        for start in range(1, len(tokens)):
+            token_index.append((' '.join(tokens[start:]), i))
+        for trigram in _trigrams(key):
+            trigrams.setdefault(trigram, []).append(i)
+    token_index.sort()
+
+    by_key = dict(zip(normalized, names))
+    by_key.update(zip(keys, names))
+
+    return _CatalogState(
+        names=names,
+        keys=keys,
+        by_key=by_key,
+        version=version,
+        normalized=normalized,
+        full_keys=[key for key, _ in full_index],
+        full_ids=[i for _, i in full_index],
+        token_keys=[key for key, _ in token_index],
+        token_ids=[i for _, i in token_index],
+        trigrams=trigrams,
+    )
+
+class LocationCatalog:
+    def __init__(self, loader, ttl=300):
+        self.loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Rebuilt off to the side and swapped in as a whole
+        self._state = _build_state([])
+        self._loaded_at = None
+        self._refreshing = False
+        self._refresh_guard = threading.Lock()
+        # Lookups run on threadpool workers; a bare += would lose counts
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def refresh(self):
+        """Reload the location names, rebuild the indexes and return the new version"""
+        with self._lock:
+            self._state = _build_state(self.loader())
+            self._loaded_at = time.monotonic()
+        return self._state.version
+
+    def _refresh_in_background(self):
+        with self._refresh_guard:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing location catalog: {str(e)}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="location-catalog-refresh", daemon=True).start()
+
+    def _record(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _current(self, count=True):
+        # Only lookups count as hits/misses; version reads for ETags do not
+        if self._loaded_at is None:
+            if count:
+                self._record(False)
+            self.refresh()
+        elif time.monotonic() - self._loaded_at > self.ttl:
+            # Past the TTL, keep serving the current names while a thread reloads
+            # them, so async handlers never wait on the loader's database query
+            if count:
+                self._record(False)
+            self._refresh_in_background()
+        elif count:
+            self._record(True)
+        return self._state
+
+    @property
+    def version(self):
+        return self._current(count=False).version
+
+    def names(self, limit=None):
+        """Return the first `limit` (or all) location names in sorted order, as a read-only sequence"""
+        names = self._current().names
+        return names if limit is None else names[:limit]
+
+    def prefix(self, prefix, limit=None):
+        """Return the names starting with `prefix` (case-insensitive) via bisect on the sorted keys"""
+        state = self._current()
+        start, end = _prefix_range(state.keys, prefix.lower())
+        if limit is not None:
+            end = min(end, start + limit)
+        return state.names[start:end]
+
+    def resolve(self, name):
+        """Return the stored spelling of `name`, or None if it is not a known location"""
+        by_key = self._current().by_key
+        return by_key.get(name.lower()) or by_key.get(normalize_location(name))
+
+    def autocomplete(self, query, limit=10):
+        """Return up to `limit` names matching `query` as a typed prefix, falling back to fuzzy matches"""
+        state = self._current()
+        key = normalize_location(query)
+        if not key or limit <= 0:
+            return []
+
+        # Names starting with the query come first, then names with a later word starting with it
+        matches = []
+        seen = set()
+        for keys, ids in ((state.full_keys, state.full_ids), (state.token_keys, state.token_ids)):
+            start, end = _prefix_range(keys, key)
+            for position in range(start, end):
+                i = ids[position]
+                if i not in seen:
+                    seen.add(i)
+                    matches.append(i)
+                    if len(matches) == limit:
+                        return [state.names[i] for i in matches]
+
+        if not matches:
+            # Nothing starts with the query, so treat it as a misspelling
+            matches = self._fuzzy_ids(state, key, limit)
+        return [state.names[i] for i in matches]
+
+    def _fuzzy_ids(self, state, key, limit):
+        # Rank candidates by shared trigrams, then confirm with a bounded edit distance
+        query_trigrams = _trigrams(key)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(state.trigrams.get(trigram, ()))
+
+        # An edit (or transposition) breaks at most four trigrams, so weaker
+        # overlaps cannot be close enough
+        max_distance = max(1, len(key) // 5)
+        min_shared = max(1, len(query_trigrams) - 4 * max_distance)
+        # Names within max_distance of the query's length are all checked; the
+        # cap only applies to longer names, which can match just as a prefix
+        whole, partial = [], []
+        for i, count in shared.items():
+            if count >= min_shared:
+                if abs(len(state.normalized[i]) - len(key)) <= max_distance:
+                    whole.append(i)
+                else:
+                    partial.append((-count, i))
+        candidates = whole + [i for _, i in heapq.nsmallest(FUZZY_CANDIDATES, partial)]
+
+        scored = []
+        for i in candidates:
+            candidate = state.normalized[i]
+            # Compare against the same-length prefix too, since the user may still be typing
+            distance = min(
+                bounded_edit_distance(key, candidate, max_distance),
+                bounded_edit_distance(key, candidate[:len(key)], max_distance)
+            )
+            if distance <= max_distance:
+                scored.append((distance, len(candidate), i))
+
+        scored.sort()
+        return [i for _, _, i in scored[:limit]]
@@ -0,0 +1,284 @@
+import os
+import time
+import bisect
+import functools
+import threading
+import contextlib
+
+# Stage timers are only recorded with STAGE_TIMING=1; otherwise they cost a no-op context
+STAGE_TIMING = os.getenv("STAGE_TIMING") == "1"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        registry.register(self)
+
+    def labels(self, *values):
+        """Return the child for one combination of label values, creating it on first use"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _items(self):
+        with self._lock:
+            return list(self._children.items())
+
+class _CounterChild:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}" for key, child in self._items()]
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def dec(self, amount=1.0):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+class _HistogramChild:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if index < len(self.counts):
+                self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def samples(self):
+        lines = []
+        for key, child in self._items():
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+class CallbackMetric:
+    """A gauge or counter whose values are read from `collect()` at scrape time
+
+    collect() returns {label values tuple: value}, or a single number when there are no labels.
+    """
+
+    def __init__(self, name, help, collect, labelnames=(), kind='gauge', registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.collect = collect
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def samples(self):
+        try:
+            values = self.collect()
+        except Exception as e:
+            print(f"Error collecting metric {self.name}: {str(e)}")
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values.items()]
+
+STAGE_DURATION = Histogram(
+    'flu_stage_duration_seconds', 'Time spent in instrumented stages of the risk pipeline', ['stage'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+_NULL_STAGE = contextlib.nullcontext()
+
+class _StageTimer:
+    __slots__ = ('child', 'start')
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+def stage(name):
+    """Time a block into flu_stage_duration_seconds{stage=name} when STAGE_TIMING is on"""
+    if not STAGE_TIMING:
+        return _NULL_STAGE
+    return _StageTimer(STAGE_DURATION.labels(name))
+
+def timed(name):
+    """Decorator form of stage(); leaves the function untouched when STAGE_TIMING is off"""
+    def decorator(fn):
+        if not STAGE_TIMING:
+            return fn
+        child = STAGE_DURATION.labels(name)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route template', ['method', 'route', 'status']
+)
+REQUESTS_IN_FLIGHT = Gauge('http_requests_in_flight', 'HTTP requests currently being served', ['method'])
+# Server-Sent Events responses last as long as the client stays connected; kept out of
+# the latency histogram so they do not drag its upper quantiles to connection lifetimes
+STREAM_DURATION = Histogram(
+    'http_stream_duration_seconds', 'Streaming (text/event-stream) connection lifetime by route template', ['method', 'route'],
+    buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 14400.0)
+)
+
+class MetricsMiddleware:
+    """Record per-route latency and in-flight requests for every HTTP request
+
+    Event-stream responses are recorded in http_stream_duration_seconds instead.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "500"
+        streaming = False
+        in_flight = REQUESTS_IN_FLIGHT.labels(method)
+
+        async def send_with_status(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                streaming = any(key.lower() == b"content-type" and value.startswith(b"text/event-stream")
+                                for key, value in message.get("headers", []))
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            # The router stores the matched route in the scope; label by its template, not the raw path
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            if streaming:
+                STREAM_DURATION.labels(method, route_path).observe(time.perf_counter() - start)
+            else:
+                REQUEST_DURATION.labels(method, route_path, status).observe(time.perf_counter() - start)
@@ -0,0 +1,235 @@
+import os
+import re
+import sys
+import time
+import random
+import cProfile
+import functools
+import threading
+import contextlib
+from collections import Counter
+from starlette.concurrency import run_in_threadpool
+
+# Nothing is profiled unless PROFILING=1
+PROFILING_ENABLED = os.getenv("PROFILING") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/flu_profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# When set, the X-Profile header must carry this token instead of "1"; reading
+# profiles back through /api/profiles always requires it
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_HEADER = "x-profile"
+
+# Frames a thread sits in while idle; stacks ending in these files are not samples of work
+_IDLE_FILES = ('threading.py', 'selectors.py', 'queue.py')
+
+_NAME_PATTERN = re.compile(r'^[0-9]+-[A-Za-z0-9_.-]+\.(prof|folded)$')
+
+class ProfileRing:
+    """Bounded directory of profile files; the oldest are removed past `keep`"""
+
+    def __init__(self, directory=PROFILE_DIR, keep=PROFILE_KEEP):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def new_name(self, label, extension):
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_')[:80] or 'profile'
+        return f"{time.time_ns()}-{slug}.{extension}"
+
+    def path(self, name):
+        """Return the path of a stored profile, or None for names that are not ours"""
+        if not _NAME_PATTERN.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def save(self, profiler, name):
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.write(os.path.join(self.directory, name))
+        with self._lock:
+            names = sorted(entry for entry in os.listdir(self.directory) if _NAME_PATTERN.match(entry))
+            for old_name in names[:-self.keep]:
+                try:
+                    os.remove(os.path.join(self.directory, old_name))
+                except FileNotFoundError:
+                    pass
+        return name
+
+    def list(self):
+        """Stored profiles, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted((entry for entry in os.listdir(self.directory) if _NAME_PATTERN.match(entry)), reverse=True):
+            timestamp, _, rest = name.partition('-')
+            label, _, kind = rest.rpartition('.')
+            profiles.append({
+                "name": name,
+                "label": label,
+                "kind": "cprofile" if kind == "prof" else "stack-samples",
+                "created_at": int(timestamp) / 1e9,
+                "bytes": os.path.getsize(os.path.join(self.directory, name))
+            })
+        return profiles
+
+class CProfiler:
+    """Deterministic profile of the calling thread, saved as a pstats file"""
+    extension = 'prof'
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def write(self, path):
+        self._profile.dump_stats(path)
+
+class StackSampler:
+    """Statistical profile of every thread, saved as folded stacks (one 'a;b;c count' line per stack)
+
+    Request work hops between the event loop and threadpool workers, which a
+    per-thread cProfile would miss, so requests are sampled across threads.
+    The profile is therefore process-wide: anything else running meanwhile
+    shows up in it too.
+    """
+    extension = 'folded'
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or frame.f_code.co_filename.endswith(_IDLE_FILES):
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            self.counts[';'.join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w') as profile_file:
+            for stack, count in self.counts.most_common():
+                profile_file.write(f"{stack} {count}\n")
+
+profile_ring = ProfileRing()
+
+_active = threading.local()
+
+@contextlib.contextmanager
+def profile_run(label, ring=profile_ring, enabled=None):
+    """cProfile the enclosed block into the ring when profiling is enabled
+
+    Nested runs on the same thread are covered by the outer profile.
+    """
+    if not (PROFILING_ENABLED if enabled is None else enabled) or getattr(_active, 'running', False):
+        yield None
+        return
+    profiler = CProfiler()
+    name = ring.new_name(label, profiler.extension)
+    _active.running = True
+    profiler.start()
+    try:
+        yield name
+    finally:
+        profiler.stop()
+        _active.running = False
+        ring.save(profiler, name)
+        print(f"Saved profile {os.path.join(ring.directory, name)}")
+
+def profiled(label):
+    """Decorator form of profile_run(); leaves the function untouched when profiling is off"""
+    def decorator(fn):
+        if not PROFILING_ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with profile_run(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def is_authorized(header_value):
+    if header_value is None:
+        return False
+    return header_value == PROFILE_TOKEN if PROFILE_TOKEN else header_value == "1"
+
+class ProfilingMiddleware:
+    """Sample-profile requests that send `X-Profile` or fall in the sampling rate
+
+    The profile name is returned in the `X-Profile-Id` response header. Stack
+    samples cover every thread, so only one request is profiled at a time;
+    requests arriving meanwhile are served unprofiled, without the header.
+    """
+
+    def __init__(self, app, ring=profile_ring, sample_rate=PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.ring = ring
+        self.sample_rate = sample_rate
+        # Only touched on the event loop, so a flag is enough
+        self._profiling = False
+
+    def _finish(self, profiler, label, status, elapsed, name):
+        profiler.stop()
+        print(f"Profiled {label} -> {status} in {elapsed * 1000:.1f} ms: {name}")
+        self.ring.save(profiler, name)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = any(key.decode('latin-1').lower() == PROFILE_HEADER and is_authorized(value.decode('latin-1'))
+                        for key, value in scope["headers"])
+        if not requested and not (self.sample_rate and random.random() < self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+        if self._profiling:
+            await self.app(scope, receive, send)
+            return
+
+        profiler = StackSampler()
+        status = "000"
+        start = time.perf_counter()
+        label = f"{scope['method']} {scope['path']}"
+        name = self.ring.new_name(label, profiler.extension)
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", name.encode('latin-1'))]
+            await send(message)
+
+        self._profiling = True
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            # Joining the sampler thread and writing the file both block
+            await run_in_threadpool(self._finish, profiler, label, status, time.perf_counter() - start, name)
+            self._profiling = False
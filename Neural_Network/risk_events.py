@@ -0,0 +1,107 @@
+import json
+import asyncio
+
+# Risks are compared at this precision so float noise does not count as a change
+CHANGE_PRECISION = 2
+
+def _changed(previous, current, precision):
+    return {
+        key: value for key, value in current.items()
+        if key not in previous or round(previous[key], precision) != round(value, precision)
+    }
+
+def risk_changes(previous, current, precision=CHANGE_PRECISION):
+    """Return the parts of a get_flu_risk_data() result that differ from `previous`
+
+    Cities whose forecast changed are sent with their full future_risks.
+    """
+    changes = {}
+    if round(previous["national_risk"], precision) != round(current["national_risk"], precision):
+        changes["national_risk"] = current["national_risk"]
+
+    city_risks = _changed(previous["current_city_risks"], current["current_city_risks"], precision)
+    if city_risks:
+        changes["current_city_risks"] = city_risks
+    provincial_risks = _changed(previous["provincial_risks"], current["provincial_risks"], precision)
+    if provincial_risks:
+        changes["provincial_risks"] = provincial_risks
+
+    future_risks = {
+        city: risks for city, risks in current["future_risks"].items()
+        if _changed(previous["future_risks"].get(city, {}), risks, precision)
+    }
+    if future_risks:
+        changes["future_risks"] = future_risks
+    return changes
+
+def format_event(event, data, event_id=None):
+    """Format one Server-Sent Events message"""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, separators=(',', ':')))
+    return "\n".join(lines) + "\n\n"
+
+class LocalRiskBroker:
+    """In-process pub/sub for risk updates
+
+    Stands in for a shared broker (e.g. Redis pub/sub) in a single process:
+    every subscriber gets a bounded queue on the event loop, and publish()
+    fans out only what changed since the previous version. Subscribers that
+    fall behind are sent a full snapshot instead of a backlog of diffs.
+    """
+
+    def __init__(self, queue_size=8):
+        self.queue_size = queue_size
+        self.version = None
+        self.state = None
+        self._subscribers = set()
+        self._wakeup = None
+        self._wakeup_loop = None
+
+    @property
+    def wakeup(self):
+        """Event that wakes the publisher early, created on the running loop rather than at import time"""
+        loop = asyncio.get_running_loop()
+        # A fresh event if the app is started again on another loop (e.g. a new test client)
+        if self._wakeup is None or self._wakeup_loop is not loop:
+            self._wakeup, self._wakeup_loop = asyncio.Event(), loop
+        return self._wakeup
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def snapshot_event(self):
+        return ("snapshot", self.state, self.version)
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        # Let the publisher produce a first state straight away instead of at its next poll
+        if self.state is None:
+            self.wakeup.set()
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, data, version):
+        """Record a new risk state and push what changed to every subscriber; returns how many were notified"""
+        if self.state is None:
+            # Subscribers that connected before the first state get it in full
+            event = ("snapshot", data, version)
+        else:
+            changes = risk_changes(self.state, data)
+            event = ("update", changes, version) if changes else None
+        self.state, self.version = data, version
+
+        if event is None:
+            return 0
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self.snapshot_event())
+        return len(self._subscribers)
@@ -0,0 +1,130 @@
+import os
+import sys
+import gzip
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+import numpy as np
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_PRECISION = 2
+
+def _rounded(values, precision):
+    # NaN marks a day with no forecast for that city and is sent as null
+    return [None if value != value else value for value in np.round(values, precision).tolist()]
+
+def compact_risk_payload(data, precision=DEFAULT_PRECISION):
+    """Convert a get_flu_risk_data() result to parallel arrays with fixed-precision risks
+
+    future_risks[i][j] is the risk of cities[i] on dates[j].
+    """
+    cities = list(data['current_city_risks'])
+    provinces = list(data['provincial_risks'])
+    dates = sorted({day for risks in data['future_risks'].values() for day in risks})
+    day_index = {day: j for j, day in enumerate(dates)}
+
+    future = np.full((len(cities), len(dates)), np.nan)
+    for i, city in enumerate(cities):
+        for day, risk in data['future_risks'].get(city, {}).items():
+            future[i, day_index[day]] = risk
+
+    return {
+        "national_risk": round(float(data['national_risk']), precision),
+        "provinces": provinces,
+        "provincial_risks": _rounded(np.array([data['provincial_risks'][province] for province in provinces], dtype=float), precision),
+        "cities": cities,
+        "current_city_risks": _rounded(np.array([data['current_city_risks'][city] for city in cities], dtype=float), precision),
+        "dates": dates,
+        "future_risks": [_rounded(row, precision) for row in future]
+    }
+
+def encode_json(payload):
+    """Encode a payload to compact JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+def encode_default(payload):
+    # What FastAPI's JSONResponse does with a returned dict
+    from fastapi.encoders import jsonable_encoder
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+def synthetic_risk_data(n_cities, horizon=7, seed=42):
+    """Build a get_flu_risk_data()-shaped payload for `n_cities` cities"""
+    rng = random.Random(seed)
+    today = datetime(2024, 1, 15)
+    dates = [(today + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(horizon)]
+    future_risks = {f'city {i}': {day: rng.uniform(1, 10) for day in dates} for i in range(n_cities)}
+    return {
+        "national_risk": rng.uniform(1, 10),
+        "current_city_risks": {city: risks[dates[0]] for city, risks in future_risks.items()},
+        "provincial_risks": {f'province {i}': rng.uniform(1, 10) for i in range(13)},
+        "future_risks": future_risks
+    }
+
+def _best_time(encode, payload, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        body = encode(payload)
+        timings.append(time.perf_counter() - start)
+    return body, min(timings)
+
+def benchmark(data, repeats=20, precision=DEFAULT_PRECISION):
+    """Compare encode time and raw/gzip/brotli sizes of the default and compact formats"""
+    formats = {
+        'default': encode_default,
+        'compact': lambda payload: encode_json(compact_risk_payload(payload, precision)),
+    }
+    results = []
+    for name, encode in formats.items():
+        body, seconds = _best_time(encode, data, repeats)
+        results.append({
+            'format': name,
+            'encode_ms': round(seconds * 1000, 3),
+            'bytes': len(body),
+            'gzip_bytes': len(gzip.compress(body, compresslevel=6)),
+            'brotli_bytes': len(brotli.compress(body, quality=4)) if brotli is not None else None
+        })
+    return results
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Benchmark the default and compact /api/flu-risk formats')
+    parser.add_argument('--cities', type=int, nargs='*', default=[15, 200, 1000], help='Synthetic city counts; 0 uses get_flu_risk_data()')
+    parser.add_argument('--horizon', type=int, default=7)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--precision', type=int, default=DEFAULT_PRECISION)
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    print(f"JSON encoder: {'orjson' if orjson is not None else 'json'}, brotli: {'yes' if brotli is not None else 'not installed'}")
+
+    for n_cities in args.cities:
+        if n_cities == 0:
+            from api import get_flu_risk_data
+            data, label = get_flu_risk_data(), 'live data'
+        else:
+            data, label = synthetic_risk_data(n_cities, args.horizon), f'{n_cities} cities'
+        print(f"{label}:")
+        for result in benchmark(data, args.repeats, args.precision):
+            brotli_bytes = result['brotli_bytes'] if result['brotli_bytes'] is not None else '-'
+            print(f"  {result['format']:>8}: {result['encode_ms']:>8.3f} ms, {result['bytes']:>8} bytes, "
+                  f"gzip {result['gzip_bytes']:>7}, br {brotli_bytes:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+import sys
+import argparse
+import threading
+from datetime import datetime
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.config import SessionLocal
+from database.queries import save_predictions
+
+class RiskScheduler:
+    """Store a risk run every `interval` seconds
+
+    With a LeaderLock only the process holding it stores runs, so N workers
+    sharing a database do not each write their own copy of every run.
+    """
+
+    def __init__(self, compute, interval, session_factory=SessionLocal, lock=None):
+        self.compute = compute
+        self.interval = interval
+        self.session_factory = session_factory
+        self.lock = lock
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        """Compute national, provincial, city and forecast risk and store them as one run"""
+        computed_at = datetime.utcnow()
+        risk_data = self.compute()
+        with self.session_factory() as session:
+            rows = save_predictions(session, risk_data, computed_at)
+        self.last_run = computed_at
+        return rows
+
+    def run_forever(self):
+        """Store a run every `interval` seconds until stop() is called"""
+        while not self._stop.is_set():
+            # Followers retry the lock every interval and take over if the leader exits
+            if self.lock is None or self.lock.acquire():
+                try:
+                    rows = self.run_once()
+                    print(f"Stored {rows} precomputed risk predictions")
+                except Exception as e:
+                    print(f"Error precomputing risk predictions: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Run the scheduler on a daemon thread until stop() is called"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="risk-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.lock is not None:
+            self.lock.release()
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Periodically precompute and store flu risk predictions')
+    parser.add_argument('--interval', type=float, default=float(os.getenv('RISK_SCHEDULER_INTERVAL') or 300), help='Seconds between runs')
+    parser.add_argument('--once', action='store_true', help='Store one run and exit')
+    return parser.parse_args()
+
+def main():
+    from api import get_flu_risk_data
+
+    args = parse_arguments()
+    scheduler = RiskScheduler(get_flu_risk_data, args.interval)
+
+    if args.once:
+        print(f"Stored {scheduler.run_once()} precomputed risk predictions")
+    else:
+        scheduler.run_forever()
+
+if __name__ == "__main__":
+    main()
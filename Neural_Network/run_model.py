@@ -7,12 +7,119 @@ import pandas as pd
 from flu_risk_predictor import FluRiskPredictor
 from data_processor import FluDataProcessor
 import matplotlib.pyplot as plt
+from profiling import profile_run
+from window_features import CitySeries, window_features
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Run flu risk prediction model')
-    parser.add_argument('--city', type=str, help='City to predict risk for')
-    parser.add_argument('--date', type=str, help='Date to predict risk for')
-    return parser.parse_args()
+    parser.add_argument('--city', type=str, help='City to predict risk for (with --model)')
+    parser.add_argument('--date', type=str, help='Date to predict risk for, defaults to today')
+    parser.add_argument('--model', type=str, help='Score with a model saved by --save-model instead of training')
+    parser.add_argument('--save-model', type=str, help='Directory to save the trained model to')
+    parser.add_argument('--input', type=str, help="CSV or JSONL file of (city, date) queries, '-' for stdin")
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'], help='Defaults to the --input extension, csv for stdin')
+    parser.add_argument('--output', type=str, default='-', help="Results file, '-' for stdout")
+    parser.add_argument('--output-format', choices=['csv', 'jsonl'], help='Defaults to the --output extension, jsonl for stdout')
+    parser.add_argument('--batch-size', type=int, default=50000, help='Queries scored per batch')
+    parser.add_argument('--window', type=int, help="Trailing days per query, defaults to the model's training window")
+    parser.add_argument('--source', type=str, default='database', help="Sales history: 'database', a CSV file or a dataset directory")
+    args = parser.parse_args()
+    # Without queries, --model would fall through to training and overwrite the saved artifacts
+    if args.model and not (args.input or args.city):
+        parser.error("--model needs --input or --city to score")
+    if args.model and args.save_model:
+        parser.error("--save-model only applies when training, not with --model")
+    return args
+
+def _file_format(path, given, default):
+    if given:
+        return given
+    if path != '-' and path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if path != '-' and path.endswith('.csv'):
+        return 'csv'
+    return default
+
+def read_queries(path, input_format, batch_size):
+    """Yield DataFrames of up to `batch_size` (city, date) queries without reading the whole input"""
+    source = sys.stdin if path == '-' else path
+    if input_format == 'jsonl':
+        reader = pd.read_json(source, lines=True, chunksize=batch_size, dtype={'city': str, 'date': str})
+    else:
+        reader = pd.read_csv(source, chunksize=batch_size, dtype={'city': str, 'date': str})
+    for batch in reader:
+        yield batch[['city', 'date']]
+
+def score_batches(model, metadata, series, batches, window):
+    """Build window features for each batch of queries and score them with one predict call per batch"""
+    feature_columns = metadata['feature_columns']
+    mean = np.array(metadata['scaler_mean'], dtype=np.float32)
+    scale = np.array(metadata['scaler_scale'], dtype=np.float32)
+    
+    for queries in batches:
+        # An unparseable date is reported on its row instead of ending the stream
+        dates = pd.to_datetime(queries['date'], errors='coerce', format='mixed')
+        valid = dates.notna().to_numpy()
+        results = pd.DataFrame({
+            'city': queries['city'].to_numpy(),
+            'date': np.where(valid, dates.dt.strftime('%Y-%m-%d'), queries['date'].astype(object)),
+            'risk_score': np.nan,
+            'days_used': 0,
+            'error': np.where(valid, None, 'invalid date')
+        })
+        if valid.any():
+            features = window_features(series, queries['city'][valid], dates[valid], window)
+            days_used = features['days_used'].to_numpy()
+            results.loc[valid, 'days_used'] = days_used
+            scored = np.flatnonzero(valid)[days_used > 0]
+            if len(scored):
+                X = features.loc[days_used > 0, feature_columns].to_numpy(dtype=np.float32)
+                # Missing values (no population entry, no spread in a one-day window) get the training mean
+                X = (np.where(np.isnan(X), mean, X) - mean) / scale
+                # verbose=0 keeps the progress bar out of results streamed to stdout
+                results.loc[scored, 'risk_score'] = model.predict(X, batch_size=min(len(X), 8192), verbose=0).ravel()
+        yield results
+
+def write_results(results, path, output_format):
+    """Write scored batches as they arrive; returns the number of rows written"""
+    output = sys.stdout if path == '-' else open(path, 'w')
+    rows = 0
+    try:
+        for batch in results:
+            if output_format == 'jsonl':
+                text = batch.to_json(orient='records', lines=True)
+                output.write(text if text.endswith('\n') or not text else text + '\n')
+            else:
+                batch.to_csv(output, index=False, header=rows == 0)
+            output.flush()
+            rows += len(batch)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return rows
+
+def score(args):
+    """Score (city, date) queries from --input, or the single --city/--date query, with a saved model"""
+    model, metadata = FluRiskPredictor.load(args.model)
+    window = args.window or metadata['window_days']
+    
+    # History is loaded once; memory then stays flat however many queries stream through
+    data_processor = FluDataProcessor()
+    data = data_processor.load_compact_data(args.source)
+    series = CitySeries(data, data_processor.population_data, data_processor.land_area_data)
+    
+    if args.input:
+        batches = read_queries(args.input, _file_format(args.input, args.input_format, 'csv'), args.batch_size)
+    else:
+        date = args.date or pd.Timestamp.now().strftime('%Y-%m-%d')
+        batches = [pd.DataFrame({'city': [args.city], 'date': [date]})]
+    
+    rows = write_results(
+        score_batches(model, metadata, series, batches, window),
+        args.output,
+        _file_format(args.output, args.output_format, 'jsonl')
+    )
+    print(f"Scored {rows} queries", file=sys.stderr)
 
 def run_model():
     # Initialize data processor and model
@@ -56,14 +163,14 @@ def run_model():
         'future_risks': {k: float(v) for k, v in future_risks.items()}
     }
 
-def main():
+def main(save_model=None):
     # Initialize the data processor and model
     data_processor = FluDataProcessor()
     model = FluRiskPredictor()
 
     # Load and process data
     print("Loading data from database...")
-    data = data_processor.load_data('database')
+    data = data_processor.load_compact_data('database')
     features = data_processor.preprocess_sales_data(data)
     features = data_processor.add_population_data(features)
 
@@ -80,6 +187,16 @@ def main():
     print("\nTraining model...")
     history = model.train(X, y, epochs=100)
 
+    if save_model:
+        # Everything needed to rebuild and scale the features for batch scoring
+        model.save(save_model, {
+            'feature_columns': list(numerical_features.columns),
+            'scaler_mean': data_processor.scaler.mean_.tolist(),
+            'scaler_scale': data_processor.scaler.scale_.tolist(),
+            'window_days': int(data.groupby('city_key', observed=True).size().median())
+        })
+        print(f"Saved model to {save_model}")
+
     # Calculate and display national risk
     national_risk = model.calculate_national_risk(features, X)
     print(f"\nNational Flu Risk Index: {national_risk:.1f}/10")
@@ -106,4 +223,10 @@ def main():
     model.plot_history(history)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # PROFILING=1 saves a cProfile of the whole run to PROFILE_DIR
+    args = parse_arguments()
+    with profile_run("run_model"):
+        if args.model:
+            score(args)
+        else:
+            main(args.save_model) 
\ No newline at end of file
@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+import argparse
+import numpy as np
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# File layout: magic, header length, JSON header (names and dates), padding to
+# 8 bytes, then little-endian float64 arrays: current city risks, provincial
+# risks and the cities x dates future risk matrix
+MAGIC = b'FLURISK1'
+PREAMBLE = struct.Struct('<8sI')
+POINTER_FILE = 'risk_snapshot.current'
+
+def _snapshot_path(directory, version):
+    return os.path.join(directory, f'risk_snapshot.{version}.bin')
+
+def encode_snapshot(data, version):
+    """Pack a get_flu_risk_data() result into the snapshot file layout"""
+    cities = list(data['current_city_risks'])
+    provinces = list(data['provincial_risks'])
+    dates = sorted({day for risks in data['future_risks'].values() for day in risks})
+    day_index = {day: i for i, day in enumerate(dates)}
+
+    current = np.array([data['current_city_risks'][city] for city in cities], dtype='<f8')
+    provincial = np.array([data['provincial_risks'][province] for province in provinces], dtype='<f8')
+    future = np.full((len(cities), len(dates)), np.nan, dtype='<f8')
+    for row, city in enumerate(cities):
+        for day, risk in data['future_risks'].get(city, {}).items():
+            future[row, day_index[day]] = risk
+
+    header = json.dumps({
+        'version': version,
+        'built_at': time.time(),
+        'national_risk': float(data['national_risk']),
+        'cities': cities,
+        'provinces': provinces,
+        'dates': dates
+    }).encode('utf-8')
+    padding = b'\0' * ((-(PREAMBLE.size + len(header))) % 8)
+
+    return b''.join([PREAMBLE.pack(MAGIC, len(header)), header, padding, current.tobytes(), provincial.tobytes(), future.tobytes()])
+
+def publish_snapshot(directory, data, keep=3):
+    """Write a new snapshot version and atomically point readers at it"""
+    os.makedirs(directory, exist_ok=True)
+    version = time.time_ns()
+    path = _snapshot_path(directory, version)
+
+    with open(path + '.tmp', 'wb') as snapshot_file:
+        snapshot_file.write(encode_snapshot(data, version))
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(path + '.tmp', path)
+
+    pointer_path = os.path.join(directory, POINTER_FILE)
+    with open(pointer_path + '.tmp', 'w') as pointer_file:
+        pointer_file.write(str(version))
+    os.replace(pointer_path + '.tmp', pointer_path)
+
+    # Workers still mapping an older version keep it alive after unlinking
+    versions = sorted(
+        int(name.split('.')[1]) for name in os.listdir(directory)
+        if name.startswith('risk_snapshot.') and name.endswith('.bin')
+    )
+    for old_version in versions[:-keep]:
+        try:
+            os.remove(_snapshot_path(directory, old_version))
+        except FileNotFoundError:
+            pass
+
+    return version
+
+class RiskSnapshot:
+    def __init__(self, path):
+        with open(path, 'rb') as snapshot_file:
+            self._buffer = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_length = PREAMBLE.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a risk snapshot: {path}")
+        header = json.loads(self._buffer[PREAMBLE.size:PREAMBLE.size + header_length])
+        offset = PREAMBLE.size + header_length
+        offset += (-offset) % 8
+
+        self.version = header['version']
+        self.built_at = header['built_at']
+        self.national_risk = header['national_risk']
+        self.cities = header['cities']
+        self.provinces = header['provinces']
+        self.dates = header['dates']
+        self.city_index = {city: i for i, city in enumerate(self.cities)}
+
+        # Views straight into the shared mapping, no copies
+        n_cities, n_provinces, n_dates = len(self.cities), len(self.provinces), len(self.dates)
+        self.current = np.frombuffer(self._buffer, dtype='<f8', count=n_cities, offset=offset)
+        offset += self.current.nbytes
+        self.provincial = np.frombuffer(self._buffer, dtype='<f8', count=n_provinces, offset=offset)
+        offset += self.provincial.nbytes
+        self.future = np.frombuffer(self._buffer, dtype='<f8', count=n_cities * n_dates, offset=offset).reshape(n_cities, n_dates)
+
+    def city(self, location):
+        """Return the /api/flu-risk/{location} payload, or None if the city is not in the snapshot"""
+        row = self.city_index.get(location.lower())
+        if row is None:
+            return None
+        return {
+            "current_risk": float(self.current[row]),
+            "future_risks": {day: float(risk) for day, risk in zip(self.dates, self.future[row]) if not np.isnan(risk)}
+        }
+
+    def to_payload(self):
+        """Return the /api/flu-risk payload"""
+        return {
+            "national_risk": self.national_risk,
+            "current_city_risks": dict(zip(self.cities, self.current.tolist())),
+            "provincial_risks": dict(zip(self.provinces, self.provincial.tolist())),
+            "future_risks": {city: self.city(city)["future_risks"] for city in self.cities}
+        }
+
+class SnapshotReader:
+    def __init__(self, directory, poll_interval=1.0, max_age=None):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        # Seconds after built_at before a snapshot is treated as missing (e.g. the builder died)
+        self.max_age = max_age
+        self._snapshot = None
+        self._checked_at = None
+        self._reported_stale = None
+
+    def _read_pointer(self):
+        try:
+            with open(os.path.join(self.directory, POINTER_FILE)) as pointer_file:
+                return int(pointer_file.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def current(self):
+        """Return the latest published snapshot, or None before the first one is built or once it is too old"""
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.poll_interval:
+            self._checked_at = now
+            version = self._read_pointer()
+            if version is not None and (self._snapshot is None or self._snapshot.version != version):
+                try:
+                    # Swapping the reference is atomic; in-flight requests keep the old mapping
+                    self._snapshot = RiskSnapshot(_snapshot_path(self.directory, version))
+                except FileNotFoundError:
+                    pass
+        snapshot = self._snapshot
+        if snapshot is not None and self.max_age is not None and time.time() - snapshot.built_at > self.max_age:
+            if self._reported_stale != snapshot.version:
+                self._reported_stale = snapshot.version
+                print(f"Risk snapshot {snapshot.version} is older than {self.max_age:g}s, ignoring it until a new one is published")
+            return None
+        return snapshot
+
+def run_builder(directory, interval, once=False):
+    """Recompute the risk snapshot every `interval` seconds and publish it to `directory`"""
+    from api import get_flu_risk_data
+
+    while True:
+        try:
+            version = publish_snapshot(directory, get_flu_risk_data())
+            print(f"Published risk snapshot {version} to {directory}")
+        except Exception as e:
+            print(f"Error building risk snapshot: {str(e)}")
+        if once:
+            break
+        time.sleep(interval)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Build and publish shared risk snapshots for API workers')
+    parser.add_argument('--dir', default=os.getenv('RISK_SNAPSHOT_DIR', '/tmp/flu_risk_snapshots'), help='Snapshot directory shared with the workers')
+    parser.add_argument('--interval', type=float, default=float(os.getenv('RISK_SNAPSHOT_INTERVAL', '300')), help='Seconds between rebuilds')
+    parser.add_argument('--once', action='store_true', help='Publish one snapshot and exit')
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    run_builder(args.dir, args.interval, args.once)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import threading
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait for its result (or exception) instead of starting their own
+    run, for at most `timeout` seconds. Nothing is cached once the call returns.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def do(self, key, fn, timeout=None):
+        """Run fn() for `key`, or wait for the run already in flight"""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn()
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if not call.done.wait(self.timeout if timeout is None else timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError(f"Timed out waiting for in-flight call {key!r}")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "timeouts": self.timeouts, "in_flight": len(self._calls)}
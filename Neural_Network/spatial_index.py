@@ -0,0 +1,84 @@
+import threading
+import time
+import numpy as np
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371.0
+
+# Approximate population centre of each postal region (first letter of the FSA)
+POSTAL_REGION_CENTROIDS = {
+    'A': (47.9, -54.0),     # Newfoundland and Labrador
+    'B': (44.9, -63.4),     # Nova Scotia
+    'C': (46.3, -63.2),     # Prince Edward Island
+    'E': (46.2, -65.8),     # New Brunswick
+    'G': (46.9, -71.3),     # Eastern Quebec
+    'H': (45.55, -73.65),   # Montreal
+    'J': (45.9, -73.4),     # Western Quebec
+    'K': (44.9, -76.0),     # Eastern Ontario
+    'L': (43.6, -79.7),     # Central Ontario
+    'M': (43.7, -79.4),     # Toronto
+    'N': (43.2, -80.9),     # Southwestern Ontario
+    'P': (46.8, -81.0),     # Northern Ontario
+    'R': (49.9, -97.3),     # Manitoba
+    'S': (51.3, -105.5),    # Saskatchewan
+    'T': (52.0, -113.8),    # Alberta
+    'V': (49.5, -122.8),    # British Columbia
+    'X': (62.5, -114.4),    # Northwest Territories and Nunavut
+    'Y': (60.7, -135.1),    # Yukon
+}
+
+def postal_code_centroid(postal_code):
+    """Return an approximate (lat, lon) for a Canadian postal code, or None if it is not recognised"""
+    code = postal_code.strip().upper()
+    if not code:
+        return None
+    return POSTAL_REGION_CENTROIDS.get(code[0])
+
+def inverse_distance_weights(distances_km, power=2, min_distance_km=1.0):
+    """Normalised inverse-distance weights, with distances clamped so an exact hit does not divide by zero"""
+    weights = 1.0 / np.maximum(np.asarray(distances_km, dtype=float), min_distance_km) ** power
+    return weights / weights.sum()
+
+class NearestLocationIndex:
+    def __init__(self, loader, ttl=300):
+        # loader returns (name, latitude, longitude) tuples
+        self.loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (names, ball tree), swapped as a whole
+        self._state = ([], None)
+        self._loaded_at = None
+
+    def refresh(self):
+        """Reload the location coordinates and rebuild the ball tree"""
+        with self._lock:
+            rows = [(name, lat, lon) for name, lat, lon in self.loader() if lat is not None and lon is not None]
+            names = [name for name, _, _ in rows]
+            tree = None
+            if rows:
+                coordinates = np.radians([[lat, lon] for _, lat, lon in rows])
+                tree = BallTree(coordinates, metric='haversine')
+            self._state = (names, tree)
+            self._loaded_at = time.monotonic()
+        return len(names)
+
+    def _current(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            self.refresh()
+        return self._state
+
+    def nearest(self, latitude, longitude, k=3, radius_km=None):
+        """Return up to `k` (name, distance_km) pairs closest to the point, nearest first"""
+        names, tree = self._current()
+        if tree is None:
+            return []
+
+        k = min(k, len(names))
+        distances, indices = tree.query(np.radians([[latitude, longitude]]), k=k)
+        neighbours = [
+            (names[i], float(distance * EARTH_RADIUS_KM))
+            for distance, i in zip(distances[0], indices[0])
+        ]
+        if radius_km is not None:
+            neighbours = [(name, distance) for name, distance in neighbours if distance <= radius_km]
+        return neighbours
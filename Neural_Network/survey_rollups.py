@@ -0,0 +1,82 @@
+import os
+import sys
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.config import SessionLocal
+from database.queries import rebuild_survey_rollups
+
+class SurveyRollupUpdater:
+    """Batch alternative to per-insert rollup updates: recount the trailing days on an interval
+
+    Responses are stamped with the server time on insert, so only the current
+    day (and the previous one, around midnight) can still change; recounting
+    `days` trailing days keeps the cost independent of the table size.
+    """
+
+    def __init__(self, interval, days=2, session_factory=SessionLocal, lock=None):
+        self.interval = interval
+        self.days = days
+        self.session_factory = session_factory
+        self.lock = lock
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        started_at = datetime.utcnow()
+        with self.session_factory() as session:
+            rows = rebuild_survey_rollups(session, started_at - timedelta(days=self.days - 1))
+        self.last_run = started_at
+        return rows
+
+    def run_forever(self):
+        """Recount every `interval` seconds until stop() is called"""
+        while not self._stop.is_set():
+            # Like RiskScheduler, only the LeaderLock holder recounts
+            if self.lock is None or self.lock.acquire():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"Error updating survey rollups: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Run the updater on a daemon thread until stop() is called"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="survey-rollups", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.lock is not None:
+            self.lock.release()
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Rebuild survey symptom rollups from survey_responses')
+    parser.add_argument('--days', type=int, help='Recount only the trailing days (default: every day)')
+    parser.add_argument('--interval', type=float, help='Keep recounting the trailing --days every interval seconds')
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+
+    if args.interval:
+        SurveyRollupUpdater(args.interval, args.days or 2).run_forever()
+        return
+
+    since = datetime.utcnow() - timedelta(days=args.days - 1) if args.days else None
+    with SessionLocal() as session:
+        rows = rebuild_survey_rollups(session, since)
+    print(f"Rebuilt {rows} survey rollup rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+import sys
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# The 15 cities of database/sales_data.csv: (city, province, population, land area km²)
+BASE_CITIES = [
+    ('Toronto', 'Ontario', 2930000, 630.2),
+    ('Montreal', 'Quebec', 1780000, 431.5),
+    ('Vancouver', 'British Columbia', 675218, 115.0),
+    ('Calgary', 'Alberta', 1306784, 825.3),
+    ('Edmonton', 'Alberta', 1062643, 684.4),
+    ('Ottawa', 'Ontario', 1017449, 2790.3),
+    ('Winnipeg', 'Manitoba', 749607, 464.1),
+    ('Quebec City', 'Quebec', 549459, 454.3),
+    ('Hamilton', 'Ontario', 569353, 1117.2),
+    ('London', 'Ontario', 422324, 420.6),
+    ('Halifax', 'Nova Scotia', 403131, 5490.3),
+    ('Saskatoon', 'Saskatchewan', 266141, 209.6),
+    ('Regina', 'Saskatchewan', 226404, 179.2),
+    ("St. John's", 'Newfoundland and Labrador', 108860, 446.0),
+    ('Kelowna', 'British Columbia', 151957, 211.8),
+]
+
+# Approximate share of Canada's population, used to place synthetic locations
+PROVINCE_WEIGHTS = {
+    'Ontario': 0.388, 'Quebec': 0.225, 'British Columbia': 0.136, 'Alberta': 0.116,
+    'Manitoba': 0.036, 'Saskatchewan': 0.030, 'Nova Scotia': 0.026, 'New Brunswick': 0.021,
+    'Newfoundland and Labrador': 0.013, 'Prince Edward Island': 0.004, 'Northwest Territories': 0.002,
+    'Yukon': 0.002, 'Nunavut': 0.001,
+}
+
+# Named sizes used by the benchmark suite: (locations, years)
+PRESETS = {
+    'small': (15, 1),
+    'medium': (1000, 2),
+    'large': (10000, 5),
+}
+
+def generate_locations(n_locations, rng):
+    """Return city/province/population/land_area for the base cities plus synthetic towns"""
+    base = BASE_CITIES[:n_locations]
+    locations = pd.DataFrame(base, columns=['city', 'province', 'population', 'land_area'])
+    extra = n_locations - len(base)
+    if extra > 0:
+        provinces = list(PROVINCE_WEIGHTS)
+        weights = np.array(list(PROVINCE_WEIGHTS.values()))
+        towns = pd.DataFrame({
+            'city': [f'Town {i:05d}' for i in range(len(base), n_locations)],
+            'province': rng.choice(provinces, size=extra, p=weights / weights.sum()),
+            # Mostly small towns with a long tail of larger ones
+            'population': np.clip(rng.lognormal(mean=10.0, sigma=1.1, size=extra), 5000, 2_000_000).astype(np.int64),
+            'land_area': np.round(rng.lognormal(mean=5.0, sigma=0.9, size=extra), 1),
+        })
+        locations = pd.concat([locations, towns], ignore_index=True)
+    return locations
+
+def generate_sales_data(n_locations=15, years=1, end_date=None, seed=42):
+    """Generate daily pharmacy sales in the sales_data schema
+
+    Sales scale with population and follow a winter flu season peaking in
+    late January, with per-location phase shifts and day-to-day noise; flu
+    cases are a seasonal share of sales. The same seed gives the same data.
+    """
+    rng = np.random.default_rng(seed)
+    locations = generate_locations(n_locations, rng)
+    end_date = pd.Timestamp(end_date or datetime.now().date())
+    dates = pd.date_range(end=end_date, periods=int(round(365 * years)), freq='D')
+
+    # Season curve in [0, 1], shifted by up to two weeks per location
+    day_of_year = dates.dayofyear.to_numpy()
+    shift = rng.integers(-14, 15, size=(n_locations, 1))
+    season = 0.5 * (1 + np.cos(2 * np.pi * (day_of_year[np.newaxis, :] - 25 - shift) / 365))
+
+    population = locations['population'].to_numpy(dtype=np.float64)[:, np.newaxis]
+    per_capita = rng.uniform(0.0008, 0.0016, size=(n_locations, 1))
+    noise = rng.normal(1.0, 0.08, size=(n_locations, len(dates)))
+    sales = np.maximum(population * per_capita * (0.6 + 0.8 * season) * noise, 1).round()
+
+    flu_share = rng.uniform(0.05, 0.09, size=(n_locations, 1)) * (0.4 + 1.2 * season)
+    flu_cases = np.maximum(sales * flu_share * rng.normal(1.0, 0.1, size=sales.shape), 0).round()
+
+    n_dates = len(dates)
+    city_codes = np.repeat(np.arange(n_locations), n_dates)
+    return pd.DataFrame({
+        'city': pd.Categorical.from_codes(city_codes, categories=locations['city']),
+        'province': pd.Categorical(locations['province'].to_numpy()[city_codes]),
+        'date': np.tile(dates.to_numpy(), n_locations),
+        'sales': sales.ravel().astype(np.int32),
+        'flu_cases': flu_cases.ravel().astype(np.int32),
+        'population': locations['population'].to_numpy()[city_codes].astype(np.int32),
+        'land_area': locations['land_area'].to_numpy()[city_codes].astype(np.float32),
+    })
+
+def write_sales_data(data, output, file_format='csv'):
+    """Write generated data as a CSV file or a partitioned Parquet/Feather dataset"""
+    if file_format == 'csv':
+        data.assign(date=data['date'].dt.strftime('%Y-%m-%d')).to_csv(output, index=False)
+        return len(data)
+    from columnar_store import write_sales_dataset
+    return write_sales_dataset(data, output, file_format)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Generate synthetic Canadian pharmacy sales data')
+    parser.add_argument('--preset', choices=sorted(PRESETS), help='Named size; overrides --locations and --years')
+    parser.add_argument('--locations', type=int, default=15)
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--end-date', type=str, help='Last day (YYYY-MM-DD), defaults to today')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--format', choices=['csv', 'parquet', 'feather'], default='csv')
+    parser.add_argument('--output', required=True, help='CSV file or dataset directory')
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    n_locations, years = PRESETS[args.preset] if args.preset else (args.locations, args.years)
+
+    data = generate_sales_data(n_locations, years, args.end_date, args.seed)
+    rows = write_sales_data(data, args.output, args.format)
+    print(f"Wrote {rows} rows ({n_locations} locations x {len(data) // n_locations} days) to {args.output}")
+
+if __name__ == "__main__":
+    main()
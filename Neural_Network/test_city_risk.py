@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete
+
+import api
+from database.config import SessionLocal
+from database.models import SalesData
+
+CITIES = [
+    ('Toronto', 'Ontario', 2930000, 630.2, 0),
+    ('Montreal', 'Quebec', 1780000, 431.5, 0),
+    # Only older rows: the full computation scores it from the average of every city
+    ('Regina', 'Saskatchewan', 226404, 179.2, 30),
+]
+
+def _rows(days_ago_start):
+    now = datetime.now()
+    rows = []
+    for city, province, population, land_area, offset in CITIES:
+        for day in range(5):
+            rows.append(SalesData(
+                city=city, province=province, date=now - timedelta(days=days_ago_start + offset + day),
+                sales=1000 + 37 * day, flu_cases=90 + 11 * day * (1 + offset // 10),
+                population=population, land_area=land_area
+            ))
+    return rows
+
+@pytest.fixture
+def sales_rows():
+    with SessionLocal() as session:
+        session.add_all(_rows(1))
+        session.commit()
+    yield
+    with SessionLocal() as session:
+        session.execute(delete(SalesData))
+        session.commit()
+
+@pytest.fixture
+def old_sales_rows():
+    # Every city's rows are older than the window, so both paths take the latest-rows fallback
+    with SessionLocal() as session:
+        session.add_all(_rows(20))
+        session.commit()
+    yield
+    with SessionLocal() as session:
+        session.execute(delete(SalesData))
+        session.commit()
+
+def _assert_parity(cities):
+    full = api.get_flu_risk_data()
+    for city in cities:
+        assert api.get_city_flu_risk_data(city)['current_risk'] == pytest.approx(full['current_city_risks'][city])
+
+def test_city_risk_matches_full_computation(sales_rows):
+    # Cities with rows in the window, one without, and tracked cities with no rows at all
+    _assert_parity(['toronto', 'montreal', 'regina', 'halifax'])
+
+def test_city_risk_matches_full_computation_on_latest_rows(old_sales_rows):
+    _assert_parity(['toronto', 'regina', 'halifax'])
+
+def test_city_risk_matches_full_computation_on_bundled_csv():
+    # Empty sales table: both read database/sales_data.csv
+    _assert_parity(['toronto', 'kelowna', "st. john's"])
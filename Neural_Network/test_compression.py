@@ -0,0 +1,81 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware, choose_encoding, parse_accept_encoding
+
+BODY = "flu risk " * 200
+
+def _client():
+    async def large(request):
+        return PlainTextResponse(BODY)
+
+    async def small(request):
+        return PlainTextResponse("ok")
+
+    async def varies(request):
+        return PlainTextResponse(BODY, headers={"Vary": "Accept-Encoding"})
+
+    async def pre_encoded(request):
+        return Response(gzip.compress(BODY.encode()), headers={"Content-Encoding": "gzip"})
+
+    app = Starlette(routes=[
+        Route("/large", large), Route("/small", small), Route("/varies", varies), Route("/pre-encoded", pre_encoded)
+    ])
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+    return TestClient(app)
+
+def test_parse_accept_encoding_reads_q_values():
+    assert parse_accept_encoding("gzip;q=0.5, br, identity;q=0") == {"gzip": 0.5, "br": 1.0, "identity": 0.0}
+    assert parse_accept_encoding("GZIP;q=bad") == {"gzip": 0.0}
+    assert parse_accept_encoding("") == {}
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("*;q=0", None),
+    ("gzip;q=0, *", "br"),
+    ("gzip, br;q=0.5", "gzip"),
+    ("br;q=0, gzip;q=0.1", "gzip"),
+])
+def test_choose_encoding(monkeypatch, header, expected):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert choose_encoding(header) == expected
+
+def test_choose_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding("br") is None
+    assert choose_encoding("br, gzip;q=0.1") == "gzip"
+
+def test_gzip_response():
+    response = _client().get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text == BODY
+
+def test_refused_encoding_is_not_used():
+    response = _client().get("/large", headers={"Accept-Encoding": "gzip;q=0"})
+
+    assert "content-encoding" not in response.headers
+    assert response.text == BODY
+
+def test_small_and_pre_encoded_responses_pass_through():
+    client = _client()
+
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    response = client.get("/pre-encoded", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == BODY
+
+def test_vary_is_not_duplicated():
+    response = _client().get("/varies", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
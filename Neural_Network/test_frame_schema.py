@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_processor import FluDataProcessor
+from frame_schema import compact_sales_frame, from_day_ordinals
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), 'database', 'sales_data.csv')
+
+def test_compact_frame_round_trips_dates_and_values():
+    data = pd.read_csv(CSV_PATH)
+
+    compact = compact_sales_frame(data)
+
+    assert 'date' not in compact.columns
+    assert (from_day_ordinals(compact['day']) == pd.to_datetime(data['date'])).all()
+    assert (compact['city_key'].astype(str) == data['city'].str.lower()).all()
+    assert (compact['sales'].to_numpy() == data['sales'].to_numpy()).all()
+    assert compact.memory_usage(deep=True).sum() < data.memory_usage(deep=True).sum()
+
+def test_load_data_keeps_the_public_schema():
+    processor = FluDataProcessor()
+
+    data = processor.load_data(CSV_PATH)
+    compact = processor.load_compact_data(CSV_PATH)
+
+    assert list(data.columns) == ['city', 'province', 'date', 'sales', 'flu_cases', 'population', 'land_area']
+    assert 'day' in compact.columns and 'date' not in compact.columns
+    assert processor.data is compact
+
+def test_features_match_on_both_schemas():
+    processor = FluDataProcessor()
+
+    public = processor.preprocess_sales_data(processor.load_data(CSV_PATH))
+    compact = processor.preprocess_sales_data(processor.load_compact_data(CSV_PATH))
+
+    numeric = public.select_dtypes(include=['float64', 'int64']).columns
+    np.testing.assert_allclose(compact[numeric].to_numpy(dtype=np.float64), public[numeric].to_numpy(dtype=np.float64))
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from geo_layer import RiskLayerCache
+from location_index import LocationCatalog
+from metrics import Counter, Histogram, MetricsMiddleware, Registry, REQUEST_DURATION, STREAM_DURATION
+
+THREADS = 8
+CALLS = 5000
+
+def _hammer(fn):
+    barrier = threading.Barrier(THREADS)
+
+    def run():
+        barrier.wait()
+        for _ in range(CALLS):
+            fn()
+
+    threads = [threading.Thread(target=run) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_counters_and_histograms_render():
+    registry = Registry()
+    counter = Counter('test_total', 'Test counter', ['kind'], registry=registry)
+    histogram = Histogram('test_seconds', 'Test histogram', buckets=(0.1, 1.0), registry=registry)
+    counter.labels('a').inc()
+    counter.labels('a').inc(2)
+    histogram.observe(0.5)
+
+    lines = registry.render().splitlines()
+
+    assert 'test_total{kind="a"} 3.0' in lines
+    assert 'test_seconds_bucket{le="0.1"} 0' in lines
+    assert 'test_seconds_bucket{le="1.0"} 1' in lines
+    assert 'test_seconds_count 1' in lines
+
+def test_counter_keeps_every_increment():
+    counter = Counter('test_concurrent_total', 'Test counter', registry=Registry())
+    _hammer(counter.inc)
+    assert counter.labels().value == THREADS * CALLS
+
+def test_catalog_counts_every_lookup():
+    catalog = LocationCatalog(lambda: ['Toronto', 'Montreal'], ttl=3600)
+    catalog.refresh()
+    _hammer(lambda: catalog.resolve('toronto'))
+    assert catalog.hits + catalog.misses == THREADS * CALLS
+
+def test_layer_cache_counts_every_lookup():
+    cache = RiskLayerCache(lambda: {"type": "FeatureCollection", "features": []}, ttl=3600)
+    _hammer(lambda: cache.get("v1"))
+    assert (cache.hits, cache.misses) == (THREADS * CALLS - 1, 1)
+
+def _sample_count(histogram, *labels):
+    child = histogram._children.get(labels)
+    return 0 if child is None else child.count
+
+def test_event_streams_are_kept_out_of_request_latency():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/test-metrics/hello")
+    async def hello():
+        return PlainTextResponse("hello")
+
+    @app.get("/test-metrics/events")
+    async def events():
+        async def body():
+            yield "data: 1\n\n"
+            await asyncio.sleep(0)
+        return StreamingResponse(body(), media_type="text/event-stream")
+
+    client = TestClient(app)
+    client.get("/test-metrics/hello")
+    client.get("/test-metrics/events")
+
+    assert _sample_count(REQUEST_DURATION, "GET", "/test-metrics/hello", "200") == 1
+    assert _sample_count(REQUEST_DURATION, "GET", "/test-metrics/events", "200") == 0
+    assert _sample_count(STREAM_DURATION, "GET", "/test-metrics/events") == 1
@@ -0,0 +1,68 @@
+import pytest
+from fastapi import HTTPException
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import api
+from profiling import ProfileRing, ProfilingMiddleware
+
+def _request(headers):
+    return Request({"type": "http", "headers": [(key.encode(), value.encode()) for key, value in headers.items()]})
+
+def test_profiles_need_a_configured_token(monkeypatch):
+    monkeypatch.setattr(api, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(api, "PROFILE_TOKEN", None)
+
+    with pytest.raises(HTTPException) as error:
+        api.check_profiles_access(_request({"x-profile": "1"}))
+    assert error.value.status_code == 403
+
+def test_profiles_check_the_token(monkeypatch):
+    monkeypatch.setattr(api, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(api, "PROFILE_TOKEN", "s3cret")
+
+    for headers in ({}, {"x-profile": "1"}, {"x-profile": "wrong"}):
+        with pytest.raises(HTTPException) as error:
+            api.check_profiles_access(_request(headers))
+        assert error.value.status_code == 403
+    api.check_profiles_access(_request({"x-profile": "s3cret"}))
+
+def test_profiles_are_hidden_when_profiling_is_off(monkeypatch):
+    monkeypatch.setattr(api, "PROFILING_ENABLED", False)
+
+    with pytest.raises(HTTPException) as error:
+        api.check_profiles_access(_request({"x-profile": "s3cret"}))
+    assert error.value.status_code == 404
+
+def _profiled_app(ring):
+    async def hello(request):
+        return PlainTextResponse("hello")
+
+    return ProfilingMiddleware(Starlette(routes=[Route("/hello", hello)]), ring=ring, sample_rate=0)
+
+def test_middleware_saves_requested_profiles(tmp_path):
+    ring = ProfileRing(str(tmp_path), keep=5)
+    client = TestClient(_profiled_app(ring))
+
+    response = client.get("/hello", headers={"X-Profile": "1"})
+    unprofiled = client.get("/hello")
+
+    assert response.text == "hello"
+    assert ring.path(response.headers["x-profile-id"]) is not None
+    assert "x-profile-id" not in unprofiled.headers
+    assert [profile["name"] for profile in ring.list()] == [response.headers["x-profile-id"]]
+
+def test_middleware_profiles_one_request_at_a_time(tmp_path):
+    ring = ProfileRing(str(tmp_path), keep=5)
+    app = _profiled_app(ring)
+    # As if another request's profile were still running
+    app._profiling = True
+
+    response = TestClient(app).get("/hello", headers={"X-Profile": "1"})
+
+    assert response.text == "hello"
+    assert "x-profile-id" not in response.headers
+    assert ring.list() == []
@@ -0,0 +1,62 @@
+import asyncio
+
+import api
+from risk_events import LocalRiskBroker, risk_changes
+
+STATE = {
+    "national_risk": 4.0,
+    "provincial_risks": {"Ontario": 4.0},
+    "current_city_risks": {"Toronto": 4.0},
+    "future_risks": {"Toronto": {"2024-01-02": 4.5}},
+}
+
+def test_risk_changes_only_include_what_changed():
+    current = dict(STATE, current_city_risks={"Toronto": 5.0}, national_risk=4.001)
+    assert risk_changes(STATE, current) == {"current_city_risks": {"Toronto": 5.0}}
+
+def test_broker_creates_its_event_on_the_running_loop():
+    # Constructed outside any loop, as the module-level broker in api.py is
+    broker = LocalRiskBroker()
+
+    async def subscribe():
+        queue = broker.subscribe()
+        return broker.wakeup, broker.wakeup.is_set(), queue
+
+    first, first_set, _ = asyncio.run(subscribe())
+    second, _, _ = asyncio.run(subscribe())
+
+    assert first_set
+    assert first is not second
+
+class FlakyBroker(LocalRiskBroker):
+    """Broker whose wakeup event fails once, as a loop mismatch would"""
+
+    def __init__(self):
+        super().__init__()
+        self.failures = 1
+
+    @property
+    def wakeup(self):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("event bound to another loop")
+        return super().wakeup
+
+def test_publisher_survives_errors(monkeypatch):
+    broker = FlakyBroker()
+    monkeypatch.setattr(api, "risk_broker", broker)
+    monkeypatch.setattr(api, "RISK_EVENTS_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(api, "current_risk_version", lambda: "v1")
+    monkeypatch.setattr(api, "read_flu_risk_data", lambda: STATE)
+
+    async def run():
+        queue = asyncio.Queue()
+        broker._subscribers.add(queue)
+        publisher = asyncio.create_task(api.publish_risk_updates())
+        try:
+            return await asyncio.wait_for(queue.get(), 5)
+        finally:
+            publisher.cancel()
+
+    assert asyncio.run(run()) == ("snapshot", STATE, "v1")
+    assert broker.failures == 0
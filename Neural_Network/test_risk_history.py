@@ -0,0 +1,50 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from database.models import Base, Prediction
+from database.queries import downsample_risk_history, load_risk_history
+
+# (forecast_date, UTC timestamp, risk): local days near midnight on hosts west and east of UTC
+RUNS = [
+    (date(2024, 1, 9), datetime(2024, 1, 9, 12), 2.0),
+    # 22:00 on Jan 10 in Toronto is already Jan 11 in UTC
+    (date(2024, 1, 10), datetime(2024, 1, 11, 3), 4.0),
+    (date(2024, 1, 10), datetime(2024, 1, 10, 15), 6.0),
+    # 07:00 on Jan 11 in Tokyo is still Jan 10 in UTC
+    (date(2024, 1, 11), datetime(2024, 1, 10, 22), 8.0),
+]
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        for forecast_date, timestamp, risk in RUNS:
+            session.add(Prediction(scope='city', location='toronto', forecast_date=forecast_date, horizon=0,
+                                   risk_score=risk, timestamp=timestamp))
+            # Later forecast days of the same run are not part of the history
+            session.add(Prediction(scope='city', location='toronto', forecast_date=forecast_date, horizon=1,
+                                   risk_score=10.0, timestamp=timestamp))
+        session.commit()
+        yield session
+
+def test_range_follows_the_returned_days(session):
+    daily = load_risk_history(session, 'city', 'toronto', date(2024, 1, 10), date(2024, 1, 10))
+
+    assert [f"{day:%Y-%m-%d}" for day in daily['date']] == ['2024-01-10']
+    assert daily[['min', 'mean', 'max', 'count']].iloc[0].tolist() == [4.0, 5.0, 6.0, 2]
+
+def test_open_ranges(session):
+    assert len(load_risk_history(session, 'city', 'toronto')) == 3
+    assert [f"{day:%Y-%m-%d}" for day in load_risk_history(session, 'city', 'toronto', start=date(2024, 1, 11))['date']] == ['2024-01-11']
+    assert [f"{day:%Y-%m-%d}" for day in load_risk_history(session, 'city', 'toronto', end=date(2024, 1, 9))['date']] == ['2024-01-09']
+
+def test_weekly_downsampling_weights_days_by_runs(session):
+    weekly = downsample_risk_history(load_risk_history(session, 'city', 'toronto'), 'week')
+
+    assert len(weekly) == 1
+    assert weekly[['min', 'max', 'count']].iloc[0].tolist() == [2.0, 8.0, 4]
+    assert weekly['mean'].iloc[0] == pytest.approx(5.0)
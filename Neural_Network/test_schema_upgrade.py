@@ -0,0 +1,75 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from database.init_db import upgrade_schema
+from database.models import Base, Prediction
+
+# Tables as an earlier release created them, before the indexes and columns were added
+OLD_TABLES = [
+    """CREATE TABLE sales_data (
+        id INTEGER PRIMARY KEY, city VARCHAR, province VARCHAR, date DATETIME,
+        sales INTEGER, flu_cases INTEGER, population INTEGER, land_area FLOAT)""",
+    "CREATE INDEX ix_sales_data_city ON sales_data (city)",
+    """CREATE TABLE survey_responses (
+        id INTEGER PRIMARY KEY, age INTEGER NOT NULL, postal_code VARCHAR NOT NULL,
+        organization VARCHAR NOT NULL, organization_type VARCHAR NOT NULL, symptoms VARCHAR NOT NULL,
+        province VARCHAR NOT NULL, submission_id VARCHAR NOT NULL, timezone VARCHAR NOT NULL,
+        timestamp VARCHAR NOT NULL, user_email VARCHAR NOT NULL REFERENCES users (email), created_at DATETIME)""",
+    "CREATE INDEX ix_survey_responses_id ON survey_responses (id)",
+    """CREATE TABLE predictions (
+        id INTEGER PRIMARY KEY, user_id INTEGER REFERENCES users (id), location VARCHAR,
+        risk_score FLOAT, confidence FLOAT, timestamp DATETIME, weather_data VARCHAR, population_data VARCHAR)""",
+    "INSERT INTO predictions (location, risk_score, timestamp) VALUES ('toronto', 4.0, '2024-01-10 12:00:00')",
+    "INSERT INTO sales_data (city, province, date, sales, flu_cases, population, land_area) "
+    "VALUES ('Toronto', 'Ontario', '2024-01-10 00:00:00', 12, 3, 2794356, 631.1)",
+]
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        for statement in OLD_TABLES:
+            connection.execute(text(statement))
+    Base.metadata.create_all(engine)
+    return engine
+
+def index_names(engine, table):
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+def test_create_all_leaves_old_tables_alone(engine):
+    assert "ix_sales_data_city_date" not in index_names(engine, "sales_data")
+
+def test_adds_missing_indexes(engine):
+    upgrade_schema(engine)
+
+    assert {"ix_sales_data_city", "ix_sales_data_city_date"} <= index_names(engine, "sales_data")
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT city, sales FROM sales_data")).all() == [("Toronto", 12)]
+
+def test_adds_survey_cursor_indexes(engine):
+    upgrade_schema(engine)
+
+    assert {"ix_survey_responses_user_created_id", "ix_survey_responses_created_at"} <= index_names(engine, "survey_responses")
+
+def test_adds_prediction_columns(engine):
+    upgrade_schema(engine)
+
+    columns = {column["name"] for column in inspect(engine).get_columns("predictions")}
+    assert {"scope", "forecast_date", "horizon"} <= columns
+    assert {"ix_predictions_timestamp", "ix_predictions_scope_location_timestamp"} <= index_names(engine, "predictions")
+    with Session(engine) as session:
+        session.add(Prediction(scope="city", location="toronto", forecast_date=date(2024, 1, 11), horizon=0,
+                               risk_score=6.0, timestamp=datetime(2024, 1, 11, 12)))
+        session.commit()
+        rows = session.query(Prediction.scope, Prediction.risk_score).order_by(Prediction.id).all()
+    assert rows == [(None, 4.0), ("city", 6.0)]
+
+def test_is_idempotent(engine):
+    upgrade_schema(engine)
+    upgrade_schema(engine)
+
+    assert "ix_sales_data_city_date" in index_names(engine, "sales_data")
+    assert [column["name"] for column in inspect(engine).get_columns("predictions")].count("scope") == 1
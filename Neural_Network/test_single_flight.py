@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+def _run_concurrently(n, target):
+    start = threading.Barrier(n)
+    results, errors = [], []
+
+    def worker():
+        start.wait()
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight(timeout=5)
+    runs = []
+
+    def compute():
+        runs.append(1)
+        time.sleep(0.2)
+        return 42
+
+    results, errors = _run_concurrently(10, lambda: flight.do("all", compute))
+
+    assert errors == []
+    assert results == [42] * 10
+    assert len(runs) == 1
+    assert flight.stats() == {"calls": 10, "coalesced": 9, "timeouts": 0, "in_flight": 0}
+
+def test_error_reaches_every_waiter():
+    flight = SingleFlight(timeout=5)
+
+    def compute():
+        time.sleep(0.2)
+        raise ValueError("no sales data")
+
+    results, errors = _run_concurrently(5, lambda: flight.do("all", compute))
+
+    assert results == []
+    assert len(errors) == 5
+    assert all(isinstance(error, ValueError) for error in errors)
+
+def test_waiter_times_out_while_leader_runs():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("all", release.wait))
+    leader.start()
+    while not flight.stats()["in_flight"]:
+        time.sleep(0.01)
+
+    with pytest.raises(TimeoutError):
+        flight.do("all", lambda: None, timeout=0.05)
+
+    release.set()
+    leader.join()
+    assert flight.stats()["timeouts"] == 1
+
+def test_results_are_not_cached():
+    flight = SingleFlight()
+    values = iter([1, 2])
+
+    assert flight.do("all", lambda: next(values)) == 1
+    assert flight.do("all", lambda: next(values)) == 2
+
+def test_keys_run_independently():
+    flight = SingleFlight()
+
+    assert flight.do("city:toronto", lambda: "toronto") == "toronto"
+    assert flight.do("city:ottawa", lambda: "ottawa") == "ottawa"
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+import api
+
+def stored_run():
+    return {
+        "national_risk": 4.0,
+        "provincial_risks": {"Ontario": 4.0},
+        "current_city_risks": {"Toronto": 4.0},
+        "future_risks": {"Toronto": {"2024-01-02": 4.5}},
+        "computed_at": datetime.utcnow(),
+    }
+
+def test_freshness_check_leaves_the_run_intact():
+    run = stored_run()
+
+    assert api.is_fresh_prediction(run)
+    assert api.is_fresh_prediction(run)
+    assert "computed_at" in run
+
+def test_stored_reads_strip_computed_at(monkeypatch):
+    # The same dict on every read, as a cached run would be
+    run = stored_run()
+    monkeypatch.setattr(api, "USE_PRECOMPUTED_RISK", True)
+    monkeypatch.setattr(api, "current_risk_snapshot", lambda: None)
+    monkeypatch.setattr(api, "load_latest_predictions", lambda session: run)
+    monkeypatch.setattr(api, "load_latest_city_prediction", lambda session, city: run)
+
+    for _ in range(2):
+        assert "computed_at" not in api.read_flu_risk_data()
+        assert "computed_at" not in api.read_city_flu_risk_data("Toronto")
+    assert api.read_flu_risk_data()["national_risk"] == 4.0
+    assert "computed_at" in run
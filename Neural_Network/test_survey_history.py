@@ -0,0 +1,72 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import api
+from api import app, decode_survey_cursor, encode_survey_cursor
+from database.models import SurveyResponse
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(app)
+
+@pytest.fixture(scope="module")
+def user_email(client):
+    email = f"history-{uuid.uuid4().hex}@example.com"
+    client.post("/api/auth/signup", json={"name": "History", "email": email, "password": "secret", "city": "Toronto"})
+    for i in range(7):
+        response = client.post("/api/survey", json={
+            "age": 30 + i, "postalCode": "M5V 2T6", "organization": "Test", "organizationType": "school",
+            "symptoms": "fever", "province": "Ontario", "submissionId": str(i), "timezone": "America/Toronto",
+            "timestamp": datetime.now().isoformat(), "userEmail": email
+        })
+        assert response.status_code == 200
+    return email
+
+def test_cursor_round_trip():
+    survey = SurveyResponse(id=17, created_at=datetime(2024, 1, 2, 3, 4, 5, 678))
+
+    assert decode_survey_cursor(encode_survey_cursor(survey)) == (datetime(2024, 1, 2, 3, 4, 5, 678), 17)
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm8tc2VwYXJhdG9y", "MjAyNC0wMS0wMnxhYmM="])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_survey_cursor(cursor)
+    assert error.value.status_code == 400
+
+def test_pages_cover_the_history_once(client, user_email):
+    full = client.get("/api/surveys", params={"user_email": user_email}).json()
+    assert len(full) == 7
+
+    seen, cursor = [], None
+    while True:
+        params = {"user_email": user_email, "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/surveys", params=params)
+        seen.extend(survey["id"] for survey in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+
+    assert seen == [survey["id"] for survey in full]
+
+def test_stream_batches_match_full_history(client, user_email, monkeypatch):
+    monkeypatch.setattr(api, "SURVEY_STREAM_BATCH_SIZE", 2)
+    streamed = client.get("/api/surveys", params={"user_email": user_email}).json()
+
+    assert [survey["submissionId"] for survey in streamed] == [str(i) for i in range(7)]
+
+def test_bad_cursor_returns_400(client, user_email):
+    response = client.get("/api/surveys", params={"user_email": user_email, "limit": 2, "cursor": "garbage"})
+    assert response.status_code == 400
+
+def test_cursor_header_is_exposed_to_the_frontend(client, user_email):
+    response = client.get(
+        "/api/surveys", params={"user_email": user_email, "limit": 2}, headers={"Origin": "http://localhost:3000"}
+    )
+    assert response.headers["x-next-cursor"]
+    assert "X-Next-Cursor" in response.headers["access-control-expose-headers"]
@@ -0,0 +1,104 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from database.models import Base, SurveyResponse, SurveySymptomRollup
+from database.queries import (
+    ROLLUP_RESPONSES, ROLLUP_SYMPTOMATIC, add_rollup_counts, load_survey_rollups, parse_symptoms, postal_prefix,
+    rebuild_survey_rollups, record_survey_rollup, survey_rollup_counts
+)
+
+RESPONSES = [
+    (datetime(2024, 1, 15, 9), 'Ontario', 'M5V 2T6', 'Fever, cough'),
+    (datetime(2024, 1, 15, 12), 'Ontario', 'm5v1a1', 'none'),
+    (datetime(2024, 1, 15, 18), 'Ontario', 'K1A 0B1', 'fever'),
+    (datetime(2024, 1, 16, 8), 'Quebec', 'H2X 1Y4', 'sore throat,fever,fever'),
+]
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+def _add_responses(session, responses):
+    for i, (created_at, province, postal_code, symptoms) in enumerate(responses):
+        session.add(SurveyResponse(
+            age=30, postal_code=postal_code, organization="Test", organization_type="school", symptoms=symptoms,
+            province=province, submission_id=str(i), timezone="UTC", timestamp=created_at.isoformat(),
+            user_email="rollups@example.com", created_at=created_at
+        ))
+    session.flush()
+
+def _stored_counts(session):
+    rows = session.execute(select(
+        SurveySymptomRollup.day, SurveySymptomRollup.province, SurveySymptomRollup.postal_prefix,
+        SurveySymptomRollup.symptom, SurveySymptomRollup.count
+    )).all()
+    return {tuple(row[:4]): row[4] for row in rows}
+
+def test_parse_symptoms_and_postal_prefix():
+    assert parse_symptoms(" Fever, cough ,fever") == ['cough', 'fever']
+    assert parse_symptoms("None") == []
+    assert parse_symptoms("") == []
+    assert postal_prefix("m5v 2t6") == 'M5V'
+
+def test_rollup_counts():
+    counts = survey_rollup_counts(RESPONSES)
+    day = date(2024, 1, 15)
+
+    assert counts[(day, 'Ontario', 'M5V', ROLLUP_RESPONSES)] == 2
+    assert counts[(day, 'Ontario', 'M5V', ROLLUP_SYMPTOMATIC)] == 1
+    assert counts[(day, 'Ontario', 'M5V', 'fever')] == 1
+    assert counts[(day, 'Ontario', 'K1A', 'fever')] == 1
+    assert counts[(date(2024, 1, 16), 'Quebec', 'H2X', 'fever')] == 1
+
+def test_incremental_updates_match_rebuild(session):
+    _add_responses(session, RESPONSES)
+    for survey in session.execute(select(SurveyResponse)).scalars():
+        record_survey_rollup(session, survey)
+    session.commit()
+    incremental = _stored_counts(session)
+
+    rebuild_survey_rollups(session)
+
+    assert _stored_counts(session) == incremental == dict(survey_rollup_counts(RESPONSES))
+
+def test_rebuild_is_idempotent_and_overwrites(session):
+    _add_responses(session, RESPONSES)
+    rebuild_survey_rollups(session)
+    expected = _stored_counts(session)
+
+    # An overlapping rebuild writing the same counts must not add to them
+    add_rollup_counts(session, survey_rollup_counts(RESPONSES), replace=True)
+    session.commit()
+    rebuild_survey_rollups(session)
+
+    assert _stored_counts(session) == expected
+
+def test_partial_rebuild_keeps_earlier_days(session):
+    _add_responses(session, RESPONSES)
+    rebuild_survey_rollups(session)
+    expected = _stored_counts(session)
+
+    rebuild_survey_rollups(session, datetime(2024, 1, 16))
+
+    assert _stored_counts(session) == expected
+
+def test_load_survey_rollups(session):
+    _add_responses(session, RESPONSES)
+    rebuild_survey_rollups(session)
+
+    by_province = load_survey_rollups(session, date(2024, 1, 1), date(2024, 1, 31))
+    ontario = by_province[by_province['province'] == 'Ontario'].iloc[0]
+    assert (ontario['responses'], ontario['symptomatic'], ontario['fever'], ontario['cough']) == (3, 2, 2, 1)
+    assert list(by_province['province']) == ['Ontario', 'Quebec']
+
+    by_prefix = load_survey_rollups(session, prefix='m5v 2t6', by_prefix=True)
+    assert list(by_prefix['postal_prefix']) == ['M5V']
+    assert by_prefix['responses'].tolist() == [2]
+
+    assert load_survey_rollups(session, date(2025, 1, 1)).empty
@@ -0,0 +1,139 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processor import FluDataProcessor, risk_levels
+from flu_risk_predictor import FluRiskPredictor
+from frame_schema import compact_sales_frame, from_day_ordinals
+from synthetic_data import generate_sales_data
+from window_features import FEATURE_COLUMNS, CitySeries, WindowDataset, window_features
+
+END_DATE = '2024-03-31'
+
+@pytest.fixture(scope='module')
+def sales():
+    return compact_sales_frame(generate_sales_data(n_locations=5, years=0.25, end_date=END_DATE, seed=7))
+
+def test_full_window_matches_preprocess_sales_data(sales):
+    processor = FluDataProcessor()
+    expected = processor.add_population_data(processor.preprocess_sales_data(sales.copy()))
+    series = CitySeries(sales, processor.population_data, processor.land_area_data)
+
+    actual = window_features(series, expected['city'], [END_DATE] * len(expected), window=len(sales))
+
+    assert (actual['days_used'] == sales.groupby('city', observed=True).size().loc[expected['city']].to_numpy()).all()
+    np.testing.assert_allclose(
+        actual[FEATURE_COLUMNS].to_numpy(dtype=np.float64),
+        expected[FEATURE_COLUMNS].to_numpy(dtype=np.float64),
+        rtol=1e-6, equal_nan=True
+    )
+
+def test_trailing_window_matches_slice(sales):
+    series = CitySeries(sales)
+    city = sales['city'].cat.categories[0]
+    history = sales[sales['city'] == city].sort_values('day').iloc[:30]
+
+    actual = window_features(series, [city], [from_day_ordinals(history['day'].iloc[-1:])[0]], window=14).iloc[0]
+
+    window = history.iloc[-14:]
+    assert actual['days_used'] == 14
+    assert actual['total_sales'] == window['sales'].sum()
+    assert actual['peak_flu_cases'] == window['flu_cases'].max()
+    assert actual['sales_trend'] == pytest.approx(np.polyfit(np.arange(14), window['sales'], 1)[0])
+
+def test_unknown_city_and_dates_before_history(sales):
+    series = CitySeries(sales)
+    city = sales['city'].cat.categories[0]
+
+    actual = window_features(series, ['Atlantis', city], [END_DATE, '2020-01-01'], window=28)
+
+    assert actual['days_used'].tolist() == [0, 0]
+    assert actual['population'].isna().tolist() == [True, False]
+
+def test_population_table_leaves_missing_cities_nan(sales):
+    series = CitySeries(sales, population={'Toronto': 2.93})
+    assert series.population[series.index['toronto']] == 2.93
+    assert np.isnan(series.population[series.index['montreal']])
+
+def test_cities_without_population_are_dropped(sales):
+    series = CitySeries(sales, population={'Toronto': 2.93, 'Montreal': 1.78}, land_area={'Toronto': 630.2, 'Montreal': 431.5})
+    dataset = WindowDataset(series, window=7, horizon=3)
+
+    cities = {series.names[i] for i in dataset._city[dataset.ends]}
+
+    assert cities == {'Toronto', 'Montreal'}
+    dataset.fit_scaler()
+    X, _ = dataset.samples(np.arange(len(dataset)))
+    assert np.isfinite(X).all()
+
+def test_windows_are_views(sales):
+    dataset = WindowDataset(CitySeries(sales), window=7, horizon=3)
+    assert np.shares_memory(dataset._sales, dataset.series.sales)
+    assert np.shares_memory(dataset._flu, dataset.series.flu_cases)
+
+def test_windows_stay_within_one_city_and_skip_gaps(sales):
+    days = sales.groupby('city', observed=True).size()
+    complete = WindowDataset(CitySeries(sales), window=7, horizon=3)
+    assert len(complete) == (days - 7 - 3 + 1).sum()
+
+    # Dropping one day removes every window/target pair that spans it
+    city = days.index[0]
+    gap = sales[sales['city'] == city]['day'].sort_values().iloc[40]
+    with_gap = WindowDataset(CitySeries(sales[~((sales['city'] == city) & (sales['day'] == gap))]), window=7, horizon=3)
+    assert len(with_gap) == len(complete) - (7 + 3)
+
+def test_samples_match_window_features_and_create_target(sales):
+    processor = FluDataProcessor()
+    series = CitySeries(sales, processor.population_data, processor.land_area_data)
+    dataset = WindowDataset(series, window=7, horizon=3)
+    scaler = dataset.fit_scaler()
+
+    X, y = dataset.samples(np.array([0, len(dataset) - 1]))
+
+    for row, end in enumerate(dataset.ends[[0, -1]]):
+        city = series.names[dataset._city[end]]
+        day = from_day_ordinals(series.day[[end, end + 3]])
+        expected = window_features(series, [city, city], day, window=7)
+        np.testing.assert_allclose(scaler.inverse_transform(X[row:row + 1])[0], expected[FEATURE_COLUMNS].iloc[0], rtol=1e-4)
+        target = expected.iloc[1]
+        assert y[row] == risk_levels(target['total_sales'], target['total_flu_cases'], target['population'], target['land_area'])
+
+def test_samples_require_a_scaler(sales):
+    with pytest.raises(ValueError):
+        WindowDataset(CitySeries(sales), window=7, horizon=3).samples(np.array([0]))
+
+def test_train_windows_on_bundled_csv_is_finite():
+    processor = FluDataProcessor()
+    data = compact_sales_frame(pd.read_csv(os.path.join(os.path.dirname(__file__), 'database', 'sales_data.csv')))
+    # St. John's and Kelowna are missing from the processor's population tables
+    dataset = WindowDataset(CitySeries(data, processor.population_data, processor.land_area_data), window=14, horizon=3)
+    predictor = FluRiskPredictor()
+
+    history = predictor.train_windows(dataset, epochs=2, batch_size=64)
+
+    train, _ = dataset.split(0.2)
+    train.scaler = predictor.scaler
+    X, y = train.samples(np.arange(len(train)))
+    assert np.isfinite(X).all() and np.isfinite(y).all()
+    assert np.allclose(X.mean(axis=0), 0, atol=1e-4)
+    assert np.isfinite(history.history['loss']).all()
+    assert np.isfinite(history.history['val_loss']).all()
+
+def test_split_puts_validation_after_training(sales):
+    dataset = WindowDataset(CitySeries(sales), window=7, horizon=3)
+
+    train, validation = dataset.split(0.2)
+
+    assert len(train) + len(validation) == len(dataset)
+    assert dataset.series.day[train.ends].max() < dataset.series.day[validation.ends].min()
+
+def test_batches_cover_every_sample_once(sales):
+    dataset = WindowDataset(CitySeries(sales), window=7, horizon=3)
+    dataset.fit_scaler()
+
+    sizes = [len(y) for _, y in dataset.batches(batch_size=100, seed=0)]
+
+    assert sum(sizes) == len(dataset)
+    assert len(sizes) == dataset.steps(100)
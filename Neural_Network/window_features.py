@@ -0,0 +1,247 @@
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+from data_processor import risk_levels
+
+# Numeric columns of preprocess_sales_data() + add_population_data(), in training order
+FEATURE_COLUMNS = [
+    'total_sales', 'avg_daily_sales', 'sales_std', 'sales_trend', 'peak_sales', 'sales_variance',
+    'total_flu_cases', 'avg_daily_flu_cases', 'flu_cases_std', 'flu_cases_trend', 'peak_flu_cases',
+    'flu_cases_variance', 'sales_flu_correlation', 'population', 'land_area'
+]
+
+# Rows are ordered by (city, day); this packs both into one sortable key
+_CITY_SHIFT = np.int64(1 << 32)
+
+def _prefix(values):
+    return np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+
+class CitySeries:
+    """Per-city daily sales and flu cases as contiguous arrays, ordered by city then day
+
+    Rows of city i are [offsets[i], offsets[i + 1]). Prefix sums make the sum,
+    variance, trend and correlation of any row range O(1).
+    """
+
+    def __init__(self, data, population=None, land_area=None):
+        data = data.sort_values(['city_key', 'day'], kind='stable')
+        keys = data['city_key'].cat.remove_unused_categories()
+        codes = keys.cat.codes.to_numpy().astype(np.int64)
+
+        self.keys = list(keys.cat.categories)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.names = data.groupby(keys, observed=True)['city'].first().astype(str).to_numpy()
+        self.offsets = np.searchsorted(codes, np.arange(len(self.keys) + 1))
+        self.day = data['day'].to_numpy().astype(np.int64)
+        self.sort_key = codes * _CITY_SHIFT + self.day
+        self.sales = data['sales'].to_numpy().astype(np.float64)
+        self.flu_cases = data['flu_cases'].to_numpy().astype(np.float64)
+
+        # Population/land area per city from the caller's tables, with the same units and
+        # gaps (NaN) as add_population_data(); the data's own head counts without tables
+        first = data.groupby(keys, observed=True)[['population', 'land_area']].first()
+        self.population = first['population'].to_numpy(dtype=np.float64)
+        self.land_area = first['land_area'].to_numpy(dtype=np.float64)
+        if population is not None:
+            self.population = np.array([population.get(name, np.nan) for name in self.names], dtype=np.float64)
+        if land_area is not None:
+            self.land_area = np.array([land_area.get(name, np.nan) for name in self.names], dtype=np.float64)
+
+        position = np.arange(len(self.day), dtype=np.float64)
+        self._sales = (_prefix(self.sales), _prefix(self.sales ** 2), _prefix(position * self.sales))
+        self._flu = (_prefix(self.flu_cases), _prefix(self.flu_cases ** 2), _prefix(position * self.flu_cases))
+        self._cross = _prefix(self.sales * self.flu_cases)
+        # Sentinel so reduceat can take ranges that end at the last row
+        self._sales_padded = np.append(self.sales, -np.inf)
+        self._flu_padded = np.append(self.flu_cases, -np.inf)
+
+    def lookup(self, cities):
+        """Map city names to row indexes in this series, -1 for unknown cities"""
+        return np.array([self.index.get(str(city).lower(), -1) for city in cities], dtype=np.int64)
+
+    def window_bounds(self, city_index, end_day, window):
+        """Row range [start, end) of each city's days in (end_day - window, end_day]"""
+        known = city_index >= 0
+        city_part = np.where(known, city_index, 0) * _CITY_SHIFT
+        end = np.searchsorted(self.sort_key, city_part + end_day, side='right')
+        start = np.searchsorted(self.sort_key, city_part + end_day - window + 1, side='left')
+        start = np.where(known, start, end)
+        return start, end
+
+def _range_stats(prefixes, start, end, n):
+    total_prefix, square_prefix, weighted_prefix = prefixes
+    total = total_prefix[end] - total_prefix[start]
+    squares = square_prefix[end] - square_prefix[start]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / n
+        variance = np.where(n > 1, (squares - total * mean) / (n - 1), np.nan)
+        variance = np.maximum(variance, 0)
+        # Least-squares slope against 0..n-1, as np.polyfit(x, y, 1)[0]
+        weighted = weighted_prefix[end] - weighted_prefix[start] - start * total
+        sum_x = n * (n - 1) / 2
+        sum_x2 = (n - 1) * n * (2 * n - 1) / 6
+        trend = np.where(n > 1, (n * weighted - sum_x * total) / (n * sum_x2 - sum_x ** 2), 0.0)
+    return total, mean, variance, trend
+
+def _range_max(padded, start, end, n):
+    bounds = np.empty(2 * len(start), dtype=np.int64)
+    bounds[0::2] = start
+    bounds[1::2] = end
+    maxima = np.maximum.reduceat(padded, bounds)[0::2] if len(start) else np.empty(0)
+    return np.where(n > 0, maxima, np.nan)
+
+def _range_features(series, city_index, start, end, peaks=None):
+    """FEATURE_COLUMNS over rows [start, end) of the series, one row per range; city_index -1 marks unknown cities
+
+    `peaks` optionally gives the (sales, flu cases) maxima of the ranges
+    when the caller can take them more cheaply than reduceat.
+    """
+    n = (end - start).astype(np.float64)
+    if peaks is None:
+        peaks = (_range_max(series._sales_padded, start, end, n), _range_max(series._flu_padded, start, end, n))
+    sales_total, sales_mean, sales_variance, sales_trend = _range_stats(series._sales, start, end, n)
+    flu_total, flu_mean, flu_variance, flu_trend = _range_stats(series._flu, start, end, n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cross = series._cross[end] - series._cross[start]
+        covariance = (cross - sales_total * flu_total / n) / (n - 1)
+        correlation = covariance / np.sqrt(sales_variance * flu_variance)
+
+    known = city_index >= 0
+    safe_index = np.where(known, city_index, 0)
+    return pd.DataFrame({
+        'total_sales': sales_total,
+        'avg_daily_sales': sales_mean,
+        'sales_std': np.sqrt(sales_variance),
+        'sales_trend': sales_trend,
+        'peak_sales': peaks[0],
+        'sales_variance': sales_variance,
+        'total_flu_cases': flu_total,
+        'avg_daily_flu_cases': flu_mean,
+        'flu_cases_std': np.sqrt(flu_variance),
+        'flu_cases_trend': flu_trend,
+        'peak_flu_cases': peaks[1],
+        'flu_cases_variance': flu_variance,
+        'sales_flu_correlation': correlation,
+        'population': np.where(known, series.population[safe_index], np.nan),
+        'land_area': np.where(known, series.land_area[safe_index], np.nan),
+    })
+
+def window_features(series, cities, dates, window):
+    """Features of each (city, date) query over the city's trailing `window` days, computed for all queries at once
+
+    Returns a DataFrame in FEATURE_COLUMNS order plus `days_used`; queries with
+    an unknown city or no history before their date get `days_used` 0.
+    """
+    city_index = series.lookup(cities)
+    end_day = (pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]').astype(np.int64))
+    start, end = series.window_bounds(city_index, end_day, window)
+    features = _range_features(series, city_index, start, end)
+    features['days_used'] = (end - start).astype(np.int32)
+    return features
+
+class WindowDataset:
+    """(city, day) training samples over trailing windows of a CitySeries, without copying windows
+
+    Sample i has as inputs the FEATURE_COLUMNS of the `window` days ending at
+    row ends[i], the dense path's features over a window instead of a whole
+    history, and as target the create_target() risk level of the window
+    ending `horizon` days later. Build the series with the processor's
+    population tables so the target's density matches create_target().
+
+    Only windows of consecutive days within one city with a known population
+    and land area are kept. A sample is just the row index where its window
+    ends; features come from the series' prefix sums and strided window
+    views, so only a batch's rows are ever copied. fit_scaler() standardizes
+    them.
+    """
+
+    def __init__(self, series, window=28, horizon=7, stride=1, ends=None, scaler=None):
+        if window < 2 or horizon < 0 or stride < 1:
+            raise ValueError("window must be at least 2 days, stride positive and horizon non-negative")
+        self.series = series
+        self.window = window
+        self.horizon = horizon
+        self.scaler = scaler
+        # Row i of each view is the window of rows [i, i + window); reduceat over the
+        # scattered windows of a shuffled batch would scan the rows between them too
+        self._sales = np.lib.stride_tricks.sliding_window_view(series.sales, window)
+        self._flu = np.lib.stride_tricks.sliding_window_view(series.flu_cases, window)
+        self._city = np.repeat(np.arange(len(series.keys)), np.diff(series.offsets))
+        self.ends = self._valid_ends(stride) if ends is None else ends
+
+    def _valid_ends(self, stride):
+        series = self.series
+        ends = np.arange(self.window - 1, len(series.day) - self.horizon, dtype=np.int64)
+        starts = ends - self.window + 1
+        targets = ends + self.horizon
+        # Cities without a population or land area would give NaN inputs and targets
+        known = (series.population > 0) & (series.land_area > 0)
+        # Start, end and target rows in the same city, with no missing days between them
+        valid = (
+            known[self._city[ends]]
+            & (self._city[starts] == self._city[targets])
+            & (series.day[ends] - series.day[starts] == self.window - 1)
+            & (series.day[targets] - series.day[ends] == self.horizon)
+        )
+        ends = ends[valid]
+        if stride > 1:
+            ends = ends[(series.day[ends] - series.day[series.offsets[self._city[ends]]]) % stride == 0]
+        return ends
+
+    def __len__(self):
+        return len(self.ends)
+
+    @property
+    def input_dim(self):
+        return len(FEATURE_COLUMNS)
+
+    def split(self, validation_fraction=0.2):
+        """Split by end day so validation samples come after every training sample"""
+        days = self.series.day[self.ends]
+        cutoff = np.quantile(days, 1 - validation_fraction) if len(days) else 0
+        return (WindowDataset(self.series, self.window, self.horizon, ends=self.ends[days < cutoff], scaler=self.scaler),
+                WindowDataset(self.series, self.window, self.horizon, ends=self.ends[days >= cutoff], scaler=self.scaler))
+
+    def _window(self, ends):
+        starts = ends - self.window + 1
+        peaks = (self._sales[starts].max(axis=1), self._flu[starts].max(axis=1))
+        return _range_features(self.series, self._city[ends], starts, ends + 1, peaks)
+
+    def features(self, indices):
+        """Unscaled (len(indices), len(FEATURE_COLUMNS)) inputs for the given sample indices"""
+        features = self._window(self.ends[indices])
+        # Flat sales or flu cases over a window have no correlation rather than an undefined one
+        features['sales_flu_correlation'] = features['sales_flu_correlation'].fillna(0.0)
+        return features[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+
+    def fit_scaler(self, batch_size=65536):
+        """Fit a StandardScaler on this dataset's features, a batch at a time, and scale samples with it"""
+        self.scaler = StandardScaler()
+        for first in range(0, len(self), batch_size):
+            self.scaler.partial_fit(self.features(np.arange(first, min(first + batch_size, len(self)))))
+        return self.scaler
+
+    def samples(self, indices):
+        """Standardized inputs (len(indices), len(FEATURE_COLUMNS)) and risk-level targets for the given sample indices"""
+        if self.scaler is None:
+            raise ValueError("Call fit_scaler() (or pass a fitted scaler) before drawing samples")
+        X = self.scaler.transform(self.features(indices)).astype(np.float32)
+        target = self._window(self.ends[indices] + self.horizon)
+        y = risk_levels(
+            target['total_sales'].to_numpy(), target['total_flu_cases'].to_numpy(),
+            target['population'].to_numpy(), target['land_area'].to_numpy()
+        )
+        return X, y.astype(np.float32)
+
+    def batches(self, batch_size=1024, shuffle=True, seed=None, repeat=False):
+        """Yield (X, y) batches; with repeat, loop over reshuffled epochs forever (for Keras fit)"""
+        rng = np.random.default_rng(seed)
+        while True:
+            order = rng.permutation(len(self)) if shuffle else np.arange(len(self))
+            for first in range(0, len(order), batch_size):
+                yield self.samples(order[first:first + batch_size])
+            if not repeat:
+                return
+
+    def steps(self, batch_size=1024):
+        return -(-len(self) // batch_size)